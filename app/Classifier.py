@@ -0,0 +1,102 @@
+import threading
+
+import numpy as np
+import tensorflow as tf
+
+from app.FramePreprocessor import FramePreprocessor
+
+
+class Classifier:
+    """
+    A loaded TFLite model together with its preprocessing buffers and labels.
+    The interpreter is not thread-safe, so every call goes through `lock`.
+
+    Batches run on a second interpreter whose batch dimension is resized to
+    `max_batch`, created on first use; smaller batches are padded up to it,
+    so only two sets of tensors are ever allocated.
+    """
+
+    def __init__(self, spec, roi=None, max_batch=1):
+        self.spec = spec
+        self.labels = spec.load_labels()
+        interpreter = tf.lite.Interpreter(model_path=spec.path)
+        interpreter.allocate_tensors()
+        self.input_details = interpreter.get_input_details()
+        self.output_details = interpreter.get_output_details()
+
+        input_shape = self.input_details[0]['shape']
+        input_dtype = self.input_details[0]['dtype']
+        if list(input_shape) != spec.input_shape or np.dtype(input_dtype).name != spec.input_dtype:
+            print(f"Warning: registry describes {spec.name} as {spec.input_shape} {spec.input_dtype}, "
+                  f"model reports {list(input_shape)} {np.dtype(input_dtype).name}. Using the model's.")
+
+        self.preprocessor = FramePreprocessor(
+            input_shape, input_dtype, roi, self.input_details[0].get('quantization', (0.0, 0))
+        )
+        self.output_scale, self.output_zero_point = self.output_details[0].get('quantization', (0.0, 0))
+        self.lock = threading.Lock()
+
+        # (interpreter, preallocated input buffer) for single frames and for batches
+        self.single = (interpreter, np.empty(input_shape, dtype=input_dtype))
+        self.batched = None
+        self.max_batch = max_batch
+        self.batching_supported = max_batch > 1
+
+    def _batch_interpreter(self):
+        """Return the interpreter and input buffer resized to max_batch, creating them if needed."""
+        if self.batched is None:
+            input_shape = [self.max_batch] + [int(d) for d in self.input_details[0]['shape'][1:]]
+            interpreter = tf.lite.Interpreter(model_path=self.spec.path)
+            interpreter.resize_tensor_input(self.input_details[0]['index'], input_shape)
+            interpreter.allocate_tensors()
+            buffer = np.empty(input_shape, dtype=self.input_details[0]['dtype'])
+            self.batched = (interpreter, buffer)
+        return self.batched
+
+    def _invoke(self, interpreter, buffer, frames):
+        """Preprocess frames into the first rows of buffer, run the model and return their output rows."""
+        for i, frame in enumerate(frames):
+            self.preprocessor.process(frame, out=buffer[i])
+        interpreter.set_tensor(self.input_details[0]['index'], buffer)
+        interpreter.invoke()
+        return interpreter.get_tensor(self.output_details[0]['index'])[:len(frames)]
+
+    def _invoke_batches(self, frames):
+        interpreter, buffer = self._batch_interpreter()
+        return np.concatenate([
+            self._invoke(interpreter, buffer, frames[start:start + self.max_batch])
+            for start in range(0, len(frames), self.max_batch)
+        ])
+
+    def infer_batch(self, frames):
+        """Run the model on several frames at once and return raw scores, one row per frame."""
+        with self.lock:
+            if len(frames) == 1 or not self.batching_supported:
+                output_data = np.concatenate([self._invoke(*self.single, [frame]) for frame in frames])
+            else:
+                try:
+                    output_data = self._invoke_batches(frames)
+                except (ValueError, RuntimeError) as e:
+                    # Models with a fixed batch dimension cannot be resized
+                    print(f"Batching not supported by {self.spec.name}, running frames one by one: {e}")
+                    self.batching_supported = False
+                    self.batched = None
+                    output_data = np.concatenate([self._invoke(*self.single, [frame]) for frame in frames])
+
+        # Dequantize integer outputs so scores are comparable across models
+        if self.output_scale:
+            return (output_data.astype(np.float32) - self.output_zero_point) * self.output_scale
+        return output_data
+
+    def infer(self, frame):
+        """Run the model on a frame and return the raw output scores as floats."""
+        return self.infer_batch([frame])[0]
+
+    def predictions(self, scores):
+        """Pair raw scores with labels, sorted by confidence, highest first."""
+        predictions = {self.labels[i]: float(scores[i]) for i in range(len(self.labels))}
+        return sorted(predictions.items(), key=lambda x: x[1], reverse=True)
+
+    def classify(self, frame):
+        """Return (label, confidence) pairs sorted by confidence, highest first."""
+        return self.predictions(self.infer(frame))
@@ -0,0 +1,158 @@
+import collections
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class DatasetCapture:
+    """
+    Saves classified frames for retraining without slowing down sorting.
+
+    `submit` only copies the frame into a small bounded queue; JPEG encoding,
+    duplicate checks and disk writes happen on background writer threads.
+    Low-confidence frames are written first and always kept, confident ones
+    are sampled. Frames that look almost identical to a recent frame of the
+    same label are skipped, and the oldest files are deleted once the
+    directory grows past its quota.
+    """
+
+    def __init__(self, directory, quota_bytes, workers=1, queue_size=32,
+                 low_confidence=0.85, high_confidence_sample_rate=0.1, duplicate_distance=4):
+        """
+        Parameters:
+        - directory: Root directory; frames go to <directory>/<label>/.
+        - quota_bytes: Maximum total size of captured files.
+        - workers: Number of background writer threads.
+        - queue_size: Frames waiting to be written at most; extra confident frames are dropped.
+        - low_confidence: Frames below this confidence are always captured.
+        - high_confidence_sample_rate: Fraction of confident frames captured.
+        - duplicate_distance: Max Hamming distance of the 64-bit difference hash for a near-duplicate.
+        """
+        self.directory = directory
+        self.quota_bytes = quota_bytes
+        self.queue_size = queue_size
+        self.low_confidence = low_confidence
+        self.high_confidence_sample_rate = high_confidence_sample_rate
+        self.duplicate_distance = duplicate_distance
+        self.enabled = True
+
+        self.lock = threading.Lock()
+        self.pending = []                       # heap of (confidence, seq, frame, label)
+        self.available = threading.Semaphore(0)
+        self.sequence = itertools.count()
+        self.recent_hashes = collections.defaultdict(lambda: collections.deque(maxlen=50))
+        self.files = collections.deque()        # (path, size), oldest first
+        self.total_bytes = 0
+        self.counters = {"submitted": 0, "written": 0, "duplicates": 0, "dropped": 0, "evicted": 0}
+
+        self._scan()
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def _scan(self):
+        """Index files already on disk so the quota covers them too."""
+        existing = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                existing.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(existing):
+            self.files.append((path, size))
+            self.total_bytes += size
+
+    def submit(self, frame, label, confidence):
+        """
+        Offer a classified frame for capture. Never blocks on disk I/O.
+        Returns True if the frame was queued.
+        """
+        if not self.enabled or frame is None or label is None:
+            return False
+        if confidence >= self.low_confidence and random.random() >= self.high_confidence_sample_rate:
+            return False
+
+        frame = frame.copy()  # The caller keeps using its buffer
+        with self.lock:
+            self.counters["submitted"] += 1
+            if len(self.pending) >= self.queue_size:
+                # Queue full: drop whichever frame is most confident, possibly this one
+                worst = max(range(len(self.pending)), key=lambda i: self.pending[i][0])
+                if self.pending[worst][0] <= confidence:
+                    self.counters["dropped"] += 1
+                    return False
+                self.pending[worst] = self.pending[-1]
+                self.pending.pop()
+                heapq.heapify(self.pending)
+                self.counters["dropped"] += 1
+            else:
+                self.available.release()
+            heapq.heappush(self.pending, (confidence, next(self.sequence), frame, label))
+        return True
+
+    def stats(self):
+        """Return capture counters and disk usage."""
+        with self.lock:
+            return dict(self.counters, queued=len(self.pending), total_bytes=self.total_bytes)
+
+    def _worker(self):
+        while True:
+            self.available.acquire()
+            with self.lock:
+                confidence, seq, frame, label = heapq.heappop(self.pending)
+            try:
+                self._write(frame, label, confidence, seq)
+            except Exception as e:
+                print(f"Error capturing frame: {e}")
+
+    def _write(self, frame, label, confidence, seq):
+        frame_hash = difference_hash(frame)
+        with self.lock:
+            recent = self.recent_hashes[label]
+            if any(bin(frame_hash ^ other).count('1') <= self.duplicate_distance for other in recent):
+                self.counters["duplicates"] += 1
+                return
+            recent.append(frame_hash)
+
+        ok, buffer = cv2.imencode('.jpg', frame)
+        if not ok:
+            return
+
+        # Nanosecond timestamp plus a per-process sequence number never collides
+        directory = os.path.join(self.directory, label)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'captured_{time.time_ns()}_{seq}_c{int(confidence * 100):02d}.jpg')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(buffer.tobytes())
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            self.files.append((path, len(buffer)))
+            self.total_bytes += len(buffer)
+            self.counters["written"] += 1
+            evict = []
+            while self.total_bytes > self.quota_bytes and self.files:
+                old_path, size = self.files.popleft()
+                self.total_bytes -= size
+                evict.append(old_path)
+            self.counters["evicted"] += len(evict)
+
+        for old_path in evict:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+
+def difference_hash(frame):
+    """64-bit difference hash of a frame, used to spot near-duplicates."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
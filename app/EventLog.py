@@ -0,0 +1,290 @@
+import argparse
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+MAGIC = b'EBEL'
+VERSION = 1
+HEADER_SIZE = 4096
+HEADER_FORMAT = '<4sHHII'   # magic, version, record size, record count, label table length
+TOP_K = 3
+NO_LABEL = 255
+NO_ANGLE = -1
+
+# timestamp, station, bin_id, top-k label indexes, top-k scores, confidence,
+# servo angle, capture/inference/database/total latency in ms
+RECORD_FORMAT = '<dBH' + 'B' * TOP_K + 'f' * TOP_K + 'fh' + 'ffff'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+STAGES = ("capture_ms", "inference_ms", "database_ms", "total_ms")
+
+
+class Segment:
+    """
+    One preallocated, memory-mapped segment file of fixed-size records.
+
+    An existing segment keeps the capacity it was created with, whatever
+    `capacity` is now. Opening one with a missing or foreign header raises
+    ValueError.
+    """
+
+    def __init__(self, path, capacity, labels=None):
+        self.path = path
+        exists = os.path.exists(path)
+        if exists:
+            # Taken from the file, the configured size may have changed since
+            capacity = (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+            if capacity <= 0:
+                raise ValueError(f"{path}: segment file is truncated")
+        self.capacity = capacity
+        size = HEADER_SIZE + capacity * RECORD_SIZE
+
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        try:
+            if not exists:
+                self.file.truncate(size)
+            self.mm = mmap.mmap(self.file.fileno(), size)
+        except Exception:
+            self.file.close()
+            raise
+
+        if exists:
+            try:
+                self._read_header()
+            except Exception as e:
+                self.mm.close()
+                self.file.close()
+                raise ValueError(f"{path}: unreadable segment header ({e})") from e
+        else:
+            self.count = 0
+            self.labels = list(labels or [])
+            self.write_header()
+
+    def _read_header(self):
+        # A power cut between truncate() and write_header() leaves a zero-filled header
+        magic, version, record_size, self.count, label_length = struct.unpack_from(HEADER_FORMAT, self.mm, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            raise ValueError("unknown segment format")
+        if self.count > self.capacity:
+            raise ValueError("record count exceeds the segment size")
+        offset = struct.calcsize(HEADER_FORMAT)
+        self.labels = json.loads(bytes(self.mm[offset:offset + label_length]).decode('utf-8'))
+
+    def write_header(self):
+        table = json.dumps(self.labels).encode('utf-8')
+        offset = struct.calcsize(HEADER_FORMAT)
+        if offset + len(table) > HEADER_SIZE:
+            raise ValueError("Label table does not fit in the segment header")
+        self.mm[offset:offset + len(table)] = table
+        struct.pack_into(HEADER_FORMAT, self.mm, 0, MAGIC, VERSION, RECORD_SIZE, self.count, len(table))
+
+    def label_index(self, label):
+        if label not in self.labels:
+            self.labels.append(label)
+            self.write_header()
+        return self.labels.index(label)
+
+    def full(self):
+        return self.count >= self.capacity
+
+    def append(self, values):
+        struct.pack_into(RECORD_FORMAT, self.mm, HEADER_SIZE + self.count * RECORD_SIZE, *values)
+        self.count += 1
+        # Publish the record only once it is completely written
+        struct.pack_into('<I', self.mm, 8, self.count)
+
+    def close(self):
+        self.mm.flush()
+        self.mm.close()
+        self.file.close()
+
+
+class EventLog:
+    """
+    Append-only log of classifications and sort actions.
+
+    Each event is a fixed-size binary record written into a memory-mapped,
+    preallocated segment file, so logging costs a struct pack and no syscalls.
+    When a segment is full a new one is started and the oldest segments
+    beyond `max_segments` are deleted.
+    """
+
+    def __init__(self, directory, segment_records=65536, max_segments=32):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.max_segments = max_segments
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        # Continue the newest segment if it is intact and still has room,
+        # otherwise the first append starts a fresh one
+        segments = segment_paths(directory)
+        self.segment = None
+        if segments:
+            try:
+                segment = Segment(segments[-1], segment_records)
+            except (OSError, ValueError) as e:
+                print(f"Not continuing event log segment: {e}")
+            else:
+                if segment.full():
+                    segment.close()
+                else:
+                    self.segment = segment
+
+    def _rotate(self):
+        labels = self.segment.labels if self.segment else []
+        if self.segment:
+            self.segment.close()
+        path = os.path.join(self.directory, f'events-{time.time():.6f}.bin')
+        self.segment = Segment(path, self.segment_records, labels)
+
+        for old_path in segment_paths(self.directory)[:-self.max_segments]:
+            os.remove(old_path)
+
+    def append(self, station, bin_id, predictions, confidence=None, angle=None, latencies=None, timestamp=None):
+        """
+        Log one event.
+        Parameters:
+        - station: Index of the sorting station.
+        - bin_id: Bin the station sorts into.
+        - predictions: (label, score) pairs sorted by score; the top TOP_K are kept.
+        - confidence: Confidence the decision was based on (defaults to the top score).
+        - angle: Servo angle the item was sorted to, None if no action was taken.
+        - latencies: Dict of stage name -> milliseconds, see STAGES.
+        """
+        predictions = list(predictions or [])[:TOP_K]
+        latencies = latencies or {}
+        if confidence is None:
+            confidence = predictions[0][1] if predictions else 0.0
+
+        with self.lock:
+            if self.segment is None or self.segment.full():
+                self._rotate()
+
+            indexes = [self.segment.label_index(label) for label, _ in predictions]
+            scores = [float(score) for _, score in predictions]
+            indexes += [NO_LABEL] * (TOP_K - len(indexes))
+            scores += [0.0] * (TOP_K - len(scores))
+
+            self.segment.append([
+                time.time() if timestamp is None else timestamp,
+                station,
+                bin_id,
+                *indexes,
+                *scores,
+                float(confidence),
+                NO_ANGLE if angle is None else int(angle),
+                *[float(latencies.get(stage, 0.0)) for stage in STAGES],
+            ])
+
+    def close(self):
+        with self.lock:
+            if self.segment:
+                self.segment.close()
+                self.segment = None
+
+
+def segment_paths(directory):
+    """Return the segment files of a log directory, oldest first."""
+    return sorted(glob.glob(os.path.join(directory, 'events-*.bin')))
+
+
+def read_events(directory, since=None, until=None):
+    """
+    Yield logged events as dicts in time order.
+    Parameters:
+    - directory: Event log directory.
+    - since, until: Optional Unix timestamps bounding the events returned.
+    """
+    for path in segment_paths(directory):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+            try:
+                magic, version, record_size, count, label_length = struct.unpack_from(HEADER_FORMAT, header, 0)
+                if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+                    raise ValueError("unknown segment format")
+                offset = struct.calcsize(HEADER_FORMAT)
+                labels = json.loads(header[offset:offset + label_length].decode('utf-8'))
+            except (struct.error, ValueError) as e:
+                print(f"Skipping {path}: {e}.")
+                continue
+            data = f.read(count * RECORD_SIZE)
+
+        for values in struct.iter_unpack(RECORD_FORMAT, data[:len(data) - len(data) % RECORD_SIZE]):
+            timestamp = values[0]
+            if since is not None and timestamp < since:
+                continue
+            if until is not None and timestamp > until:
+                continue
+            indexes = values[3:3 + TOP_K]
+            scores = values[3 + TOP_K:3 + 2 * TOP_K]
+            rest = values[3 + 2 * TOP_K:]
+            yield {
+                "timestamp": timestamp,
+                "station": values[1],
+                "bin_id": values[2],
+                "predictions": [(labels[i], score) for i, score in zip(indexes, scores) if i != NO_LABEL],
+                "confidence": rest[0],
+                "angle": None if rest[1] == NO_ANGLE else rest[1],
+                "latencies": dict(zip(STAGES, rest[2:])),
+            }
+
+
+def replay(directory, since=None, until=None, speed=0.0):
+    """
+    Print events in order, optionally paced at `speed` times real time (0 prints as fast as possible).
+    """
+    previous = None
+    for event in read_events(directory, since, until):
+        if speed > 0 and previous is not None:
+            time.sleep(max(0.0, (event["timestamp"] - previous) / speed))
+        previous = event["timestamp"]
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event["timestamp"]))
+        scores = ", ".join(f"{label}: {score * 100:.1f}%" for label, score in event["predictions"])
+        action = f"servo {event['angle']}" if event["angle"] is not None else "no action"
+        print(f"{when} station {event['station']} bin {event['bin_id']} [{scores}] {action} "
+              f"({event['latencies']['total_ms']:.1f} ms)")
+
+
+def summarize(directory, since=None, until=None):
+    """
+    Print per-label counts, sort counts and average stage latencies.
+    """
+    total = 0
+    sorted_items = 0
+    top_labels = {}
+    latency_sums = dict.fromkeys(STAGES, 0.0)
+    for event in read_events(directory, since, until):
+        total += 1
+        if event["angle"] is not None:
+            sorted_items += 1
+        if event["predictions"]:
+            label = event["predictions"][0][0]
+            top_labels[label] = top_labels.get(label, 0) + 1
+        for stage in STAGES:
+            latency_sums[stage] += event["latencies"][stage]
+
+    print(f"Events: {total}, sort actions: {sorted_items}")
+    for label, count in sorted(top_labels.items(), key=lambda x: x[1], reverse=True):
+        print(f"  {label}: {count}")
+    if total:
+        for stage in STAGES:
+            print(f"  average {stage}: {latency_sums[stage] / total:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the on-device event log.")
+    parser.add_argument("command", choices=["replay", "stats"])
+    parser.add_argument("--dir", default="event_log", help="Event log directory")
+    parser.add_argument("--since", type=float, help="Only events after this Unix timestamp")
+    parser.add_argument("--until", type=float, help="Only events before this Unix timestamp")
+    parser.add_argument("--speed", type=float, default=0.0, help="Replay speed relative to real time, 0 for no pacing")
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        replay(args.dir, args.since, args.until, args.speed)
+    else:
+        summarize(args.dir, args.since, args.until)
@@ -0,0 +1,106 @@
+import cv2
+import numpy as np
+
+
+class FramePreprocessor:
+    """
+    Turns camera frames into model input tensors without per-frame allocations.
+
+    All intermediate buffers are allocated once for the model input shape and
+    reused: the frame is cropped to the chute region of interest (a view, no
+    copy), resized straight into a uint8 buffer and then normalized or
+    quantized directly into the tensor handed to the interpreter.
+
+    Quantized inputs use the tensor's (scale, zero_point): every pixel value
+    is mapped through a 256-entry table built once from pixel / 255 / scale
+    + zero_point, so any quantization costs one table lookup per value.
+    """
+
+    def __init__(self, input_shape, input_dtype=np.float32, roi=None, quantization=(0.0, 0)):
+        """
+        Parameters:
+        - input_shape: Model input shape, e.g. [1, 224, 224, 3].
+        - input_dtype: Model input dtype (float32, uint8 or int8).
+        - roi: Optional (x, y, width, height) crop given as fractions of the frame.
+        - quantization: Input (scale, zero_point) as reported by the interpreter;
+          a scale of 0 means integer inputs take the pixel values unscaled.
+        """
+        self.height = int(input_shape[1])
+        self.width = int(input_shape[2])
+        self.channels = int(input_shape[3]) if len(input_shape) > 3 else 1
+        self.input_dtype = np.dtype(input_dtype)
+        self.roi = roi
+
+        # Preallocated buffers, reused for every frame
+        self._resized = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._gray = np.empty((self.height, self.width), dtype=np.uint8)
+        self._input = np.empty((1, self.height, self.width, self.channels), dtype=self.input_dtype)
+
+        self._lut = None
+        if self.input_dtype != np.float32:
+            self._lut = quantization_table(self.input_dtype, quantization)
+
+        self._roi_cache_key = None
+        self._roi_slices = (slice(None), slice(None))
+
+    def _crop(self, frame):
+        """Return a view of the frame restricted to the region of interest."""
+        if self.roi is None:
+            return frame
+
+        frame_height, frame_width = frame.shape[:2]
+        if self._roi_cache_key != (frame_height, frame_width):
+            x, y, w, h = self.roi
+            x0 = max(0, min(frame_width - 1, int(x * frame_width)))
+            y0 = max(0, min(frame_height - 1, int(y * frame_height)))
+            x1 = max(x0 + 1, min(frame_width, int((x + w) * frame_width)))
+            y1 = max(y0 + 1, min(frame_height, int((y + h) * frame_height)))
+            self._roi_slices = (slice(y0, y1), slice(x0, x1))
+            self._roi_cache_key = (frame_height, frame_width)
+
+        return frame[self._roi_slices]
+
+    def process(self, frame, out=None):
+        """
+        Crop, resize and normalize a BGR frame into the model input layout.
+
+        Writes into `out` (one (height, width, channels) slot of a batch tensor)
+        when given. Otherwise returns the internal input buffer; it is overwritten
+        by the next call, so hand it to the interpreter before processing another frame.
+        """
+        cropped = self._crop(frame)
+        resized = cv2.resize(cropped, (self.width, self.height), dst=self._resized,
+                             interpolation=cv2.INTER_AREA)
+
+        if self.channels == 1:
+            pixels = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY, dst=self._gray)[..., np.newaxis]
+        else:
+            pixels = resized
+
+        target = self._input[0] if out is None else out
+        if self._lut is None:
+            np.multiply(pixels, np.float32(1.0 / 255.0), out=target, dtype=np.float32)
+        else:
+            # mode='clip' lets numpy write straight into target without a temporary
+            np.take(self._lut, pixels, out=target, mode='clip')
+
+        return self._input if out is None else out
+
+
+def quantization_table(dtype, quantization):
+    """
+    Return the quantized input value for every uint8 pixel value.
+    Parameters:
+    - dtype: Integer input dtype of the model.
+    - quantization: (scale, zero_point) of the input tensor.
+    """
+    dtype = np.dtype(dtype)
+    info = np.iinfo(dtype)
+    scale, zero_point = quantization
+    pixels = np.arange(256, dtype=np.float64)
+    if scale:
+        values = np.round(pixels / 255.0 / scale) + zero_point
+    else:
+        # Not quantized: raw pixel values, re-centred if the type is signed
+        values = pixels + info.min if info.min < 0 else pixels
+    return np.clip(values, info.min, info.max).astype(dtype)
@@ -0,0 +1,193 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+
+class InferenceEngine:
+    """
+    Single inference worker shared by every sorting station and viewer.
+
+    Callers submit frames and get a Future back. The worker takes the oldest
+    pending frame, waits up to `batch_window` seconds for frames from other
+    cameras to arrive, then classifies them all in one interpreter call.
+
+    With a presence gate set, the batch first goes through the gate model
+    (a tiny quantized classifier). Frames where no object is present resolve
+    to [(absent_label, confidence)] and never reach the full classifier.
+    """
+
+    def __init__(self, classifier, max_batch=4, batch_window=0.01, gate=None,
+                 presence_label="object", presence_threshold=0.5, absent_label="nothing", queue_size=16):
+        """
+        Parameters:
+        - classifier: Classifier run on frames that pass the gate.
+        - max_batch: Frames classified together at most.
+        - batch_window: Seconds to wait for more frames before running a batch.
+        - gate: Optional presence Classifier run before the main one.
+        - presence_label: Gate label whose score means an object is present.
+        - presence_threshold: Minimum presence score for a frame to reach the classifier.
+        - absent_label: Label reported for frames rejected by the gate.
+        - queue_size: Frames waiting for inference at most; further submits fail fast.
+        """
+        self.classifier = classifier
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.presence_label = presence_label
+        self.presence_threshold = presence_threshold
+        self.absent_label = absent_label
+        self.gate = None
+        self.gate_stage = None      # (gate, index of presence_label in its output), swapped as one
+        self.set_gate(gate)
+        self.requests = queue.Queue(maxsize=queue_size)
+        self.rejected = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+        self.batches = 0
+        self.frames = 0
+        self.stage_counters = {
+            "gate": {"frames": 0, "rejected": 0, "seconds": 0.0},
+            "classifier": {"frames": 0, "seconds": 0.0},
+        }
+
+    def start(self):
+        self.thread.start()
+
+    def swap(self, classifier):
+        """Replace the model; batches already running finish on the old one."""
+        self.classifier = classifier
+
+    def set_gate(self, gate):
+        """
+        Enable the presence gate with a Classifier, or disable it with None.
+        A gate without `presence_label` among its labels is refused and the current one kept.
+        Returns whether a gate is enabled afterwards.
+        """
+        if gate is None:
+            self.gate_stage = None
+            self.gate = None
+            return False
+        if self.presence_label not in gate.labels:
+            print(f"Presence gate not enabled: label '{self.presence_label}' not in {gate.labels}.")
+            return self.gate is not None
+        self.gate_stage = (gate, gate.labels.index(self.presence_label))
+        self.gate = gate
+        return True
+
+    def submit(self, frame):
+        """Queue a frame for classification and return a Future of its predictions."""
+        future = Future()
+        try:
+            self.requests.put_nowait((frame, future))
+        except queue.Full:
+            self.rejected += 1
+            future.set_exception(RuntimeError("Inference queue full"))
+        return future
+
+    def classify(self, frame, timeout=None):
+        """
+        Classify a frame, blocking until the batch it joined has run.
+        Raises TimeoutError after `timeout` seconds; the request is then cancelled.
+        """
+        future = self.submit(frame)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise TimeoutError(f"No classification within {timeout} s") from None
+
+    def stats(self):
+        """Return batching counters and per-stage frame counts and average latency."""
+        stages = {}
+        for stage, counters in self.stage_counters.items():
+            stages[stage] = dict(counters)
+            stages[stage]["average_ms"] = (
+                round(counters["seconds"] * 1000.0 / counters["frames"], 3) if counters["frames"] else 0.0
+            )
+        gate = self.stage_counters["gate"]
+        stages["gate"]["pass_rate"] = (
+            round(1.0 - gate["rejected"] / gate["frames"], 3) if gate["frames"] else None
+        )
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "average_batch": round(self.frames / self.batches, 2) if self.batches else 0.0,
+            "rejected": self.rejected,
+            "gate_enabled": self.gate is not None,
+            "stages": stages,
+        }
+
+    def _next_request(self, timeout=None):
+        """
+        Take the next request still wanted by its caller, or None if none arrives in time.
+        timeout None blocks, 0 only takes requests that are already queued.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if deadline is None:
+                request = self.requests.get()
+            else:
+                remaining = deadline - time.monotonic()
+                try:
+                    request = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+                except queue.Empty:
+                    return None
+            # Marks the future running, so it can no longer be cancelled under us
+            if request[1].set_running_or_notify_cancel():
+                return request
+
+    def _collect_batch(self):
+        batch = [self._next_request()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            request = self._next_request(max(deadline - time.monotonic(), 0))
+            if request is None:
+                break
+            batch.append(request)
+        return batch
+
+    def _apply_gate(self, gate, presence_index, frames, results):
+        """Run the presence gate and fill in results for frames without an object."""
+        start = time.perf_counter()
+        scores = gate.infer_batch(frames)
+        counters = self.stage_counters["gate"]
+        counters["seconds"] += time.perf_counter() - start
+        counters["frames"] += len(frames)
+
+        for i, row in enumerate(scores):
+            presence = float(row[presence_index])
+            if presence < self.presence_threshold:
+                results[i] = [(self.absent_label, 1.0 - presence)]
+                counters["rejected"] += 1
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            frames = [frame for frame, _ in batch]
+            classifier = self.classifier
+            gate_stage = self.gate_stage
+            try:
+                results = [None] * len(batch)
+                if gate_stage is not None:
+                    self._apply_gate(*gate_stage, frames, results)
+
+                candidates = [i for i, result in enumerate(results) if result is None]
+                if candidates:
+                    start = time.perf_counter()
+                    scores = classifier.infer_batch([frames[i] for i in candidates])
+                    counters = self.stage_counters["classifier"]
+                    counters["seconds"] += time.perf_counter() - start
+                    counters["frames"] += len(candidates)
+                    for i, row in zip(candidates, scores):
+                        results[i] = classifier.predictions(row)
+
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            self.batches += 1
+            self.frames += len(batch)
@@ -0,0 +1,141 @@
+import collections
+import os
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+
+class FramePool:
+    """
+    Fixed set of reusable frame buffers for `cap.read(image=...)`.
+
+    Buffers are handed out with acquire() and must be given back with
+    release() once nothing references the frame anymore. With a shape the
+    pool starts full, so reads do not allocate from the first frame on. When
+    the pool is empty, or the camera resolution changed so a buffer no longer
+    fits, OpenCV allocates a new frame; released frames then replace the old
+    ones, so the pool follows resolution changes on its own.
+    """
+
+    def __init__(self, size, shape=None, dtype=np.uint8):
+        """
+        Parameters:
+        - size: Buffers kept in the pool at most.
+        - shape: Frame shape (height, width, channels) to preallocate, or None to start empty.
+        - dtype: Element type of the preallocated buffers.
+        """
+        self.size = size
+        self.lock = threading.Lock()
+        self.free = collections.deque(np.empty(shape, dtype=dtype) for _ in range(size if shape else 0))
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self):
+        """Return a free buffer, or None to let the camera allocate one."""
+        with self.lock:
+            if self.free:
+                self.hits += 1
+                return self.free.popleft()
+            self.misses += 1
+            return None
+
+    def release(self, frame):
+        """Give a frame back to the pool once it is no longer used."""
+        if frame is None:
+            return
+        with self.lock:
+            if len(self.free) < self.size:
+                self.free.append(frame)
+
+    def stats(self):
+        with self.lock:
+            return {"size": self.size, "free": len(self.free), "hits": self.hits, "misses": self.misses}
+
+
+class MemoryMonitor:
+    """
+    Samples tracemalloc and reports current and peak (as sampled) memory per subsystem.
+
+    Each traced allocation is attributed to the innermost stack frame that
+    belongs to one of the subsystem paths, so numpy or OpenCV allocations
+    count towards the project code that triggered them. tracemalloc slows
+    allocations down, so this only runs in memory-budget mode.
+    """
+
+    def __init__(self, subsystems, interval=30.0, frames=16):
+        """
+        Parameters:
+        - subsystems: Dict of subsystem name -> list of source paths (files or directories).
+        - interval: Seconds between samples.
+        - frames: Stack depth recorded per allocation.
+        """
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.subsystems = {
+            name: [os.path.join(root, path) for path in paths] for name, paths in subsystems.items()
+        }
+        self.interval = interval
+        self.frames = frames
+        self.lock = threading.Lock()
+        self.current = {}
+        self.peak = {}
+        self.started = False
+
+    def start(self):
+        if self.started:
+            return
+        tracemalloc.start(self.frames)
+        self.started = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _subsystem_of(self, traceback, cache):
+        # Frames are ordered oldest first, so walk from the allocation site outwards
+        for frame in reversed(traceback):
+            filename = frame.filename
+            if filename not in cache:
+                cache[filename] = next(
+                    (name for name, paths in self.subsystems.items()
+                     if any(filename.startswith(path) for path in paths)),
+                    None,
+                )
+            if cache[filename] is not None:
+                return cache[filename]
+        return "other"
+
+    def sample(self):
+        """Take one snapshot and update the per-subsystem figures."""
+        snapshot = tracemalloc.take_snapshot()
+        totals = collections.Counter()
+        cache = {}
+        for trace in snapshot.traces:
+            totals[self._subsystem_of(trace.traceback, cache)] += trace.size
+
+        with self.lock:
+            self.current = dict(totals)
+            for name, size in totals.items():
+                self.peak[name] = max(self.peak.get(name, 0), size)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Error sampling memory usage: {e}")
+
+    def report(self):
+        """Return current and peak bytes per subsystem plus tracemalloc's process-wide figures."""
+        if not self.started:
+            return {"enabled": False}
+        traced_current, traced_peak = tracemalloc.get_traced_memory()
+        with self.lock:
+            return {
+                "enabled": True,
+                "traced_current": traced_current,
+                "traced_peak": traced_peak,
+                "subsystems": {
+                    name: {"current": self.current.get(name, 0), "peak": peak}
+                    for name, peak in self.peak.items()
+                },
+            }
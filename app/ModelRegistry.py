@@ -0,0 +1,146 @@
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+import numpy as np
+import tensorflow as tf
+
+REGISTRY_PATH = 'models/registry.json'
+
+
+class ModelSpec:
+    """Description of a TFLite model available on the device."""
+
+    def __init__(self, name, path, labels, input_shape, input_dtype, benchmark=None):
+        self.name = name
+        self.path = path
+        self.labels = labels
+        self.input_shape = list(input_shape)
+        self.input_dtype = input_dtype
+        self.benchmark = benchmark
+
+    def load_labels(self):
+        """Read the label file, one label per line."""
+        with open(self.labels, 'r') as f:
+            return [line.strip() for line in f.readlines() if line.strip()]
+
+    def to_dict(self):
+        return {
+            "path": self.path,
+            "labels": self.labels,
+            "input_shape": self.input_shape,
+            "input_dtype": self.input_dtype,
+            "benchmark": self.benchmark,
+        }
+
+
+class ModelRegistry:
+    """
+    Keeps track of the models in `models/`, which one is active, and their
+    on-device latency. Backed by a JSON file so the choice survives restarts.
+    """
+
+    def __init__(self, path=REGISTRY_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.models = {}
+        self.active = None
+        self.load()
+
+    def load(self):
+        """Load model descriptions from the registry file."""
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        self.models = {
+            name: ModelSpec(name, **entry) for name, entry in data.get("models", {}).items()
+        }
+        self.active = data.get("active")
+
+    def save(self):
+        """Write the registry back to disk atomically."""
+        data = {
+            "active": self.active,
+            "models": {name: spec.to_dict() for name, spec in self.models.items()},
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def get(self, name=None):
+        """Return the spec for `name`, or the active model if no name is given."""
+        name = name or self.active
+        if name not in self.models:
+            raise KeyError(f"Unknown model: {name}")
+        return self.models[name]
+
+    def set_active(self, name):
+        """Mark a model as active and persist the choice."""
+        with self.lock:
+            self.get(name)
+            self.active = name
+            self.save()
+
+    def describe(self):
+        """Return a JSON-serializable summary of all registered models."""
+        return {
+            "active": self.active,
+            "models": {name: spec.to_dict() for name, spec in self.models.items()},
+        }
+
+    def benchmark(self, name, runs=50, warmup=5):
+        """
+        Measure inference latency of a model on this device and record it.
+        Also refreshes the input shape and dtype from the model itself.
+        """
+        spec = self.get(name)
+        interpreter = tf.lite.Interpreter(model_path=spec.path)
+        interpreter.allocate_tensors()
+        input_detail = interpreter.get_input_details()[0]
+
+        spec.input_shape = [int(d) for d in input_detail['shape']]
+        spec.input_dtype = np.dtype(input_detail['dtype']).name
+
+        sample = np.zeros(input_detail['shape'], dtype=input_detail['dtype'])
+        timings = []
+        for i in range(warmup + runs):
+            start = time.perf_counter()
+            interpreter.set_tensor(input_detail['index'], sample)
+            interpreter.invoke()
+            elapsed = (time.perf_counter() - start) * 1000.0
+            if i >= warmup:
+                timings.append(elapsed)
+
+        timings.sort()
+        spec.benchmark = {
+            "median_ms": round(statistics.median(timings), 3),
+            "p90_ms": round(timings[int(len(timings) * 0.9) - 1], 3),
+            "runs": runs,
+            "measured_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        return spec.benchmark
+
+    def benchmark_all(self, runs=50):
+        """Benchmark every registered model and persist the results."""
+        results = {}
+        for name in self.models:
+            try:
+                results[name] = self.benchmark(name, runs=runs)
+                print(f"{name}: median {results[name]['median_ms']} ms, p90 {results[name]['p90_ms']} ms")
+            except Exception as e:
+                print(f"Failed to benchmark {name}: {e}")
+        with self.lock:
+            self.save()
+        return results
+
+
+if __name__ == "__main__":
+    # Run at install time: python -m app.ModelRegistry benchmark
+    registry = ModelRegistry()
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        registry.benchmark_all()
+    else:
+        print(json.dumps(registry.describe(), indent=4))
@@ -0,0 +1,142 @@
+import threading
+import time
+
+import config
+from app.SystemMonitor import SystemMonitor
+from app.Supervisor import heartbeat
+
+# Thermal levels
+NORMAL = 0
+WARM = 1     # Shed optional work: dataset capture
+HOT = 2      # Also pause viewer video, the SoC is about to throttle
+
+
+class PowerGovernor:
+    """
+    Slows the device down when the bin is idle or the SoC is getting hot.
+
+    The bin counts as idle when no proximity trigger was seen for `idle_after`
+    seconds; loops then stretch their sleep intervals with scale() and the
+    cameras drop to a lower frame rate. A trigger restores full rate at once.
+    The temperature from SystemMonitor sets the thermal level: WARM stretches
+    intervals further and disables capture, HOT also pauses video streams,
+    so the Pi sheds optional work before its firmware throttles the CPU.
+    """
+
+    def __init__(self, monitor, idle_after=60.0, warm_c=70.0, hot_c=77.0, hysteresis_c=3.0,
+                 idle_multiplier=3.0, thermal_multipliers=None, check_interval=5.0):
+        """
+        Parameters:
+        - monitor: SystemMonitor used to read the SoC temperature.
+        - idle_after: Seconds without a proximity trigger before the bin is idle.
+        - warm_c, hot_c: Temperatures (degrees C) entering the WARM and HOT levels.
+        - hysteresis_c: Degrees below a threshold needed to leave its level again.
+        - idle_multiplier: Interval multiplier while idle.
+        - thermal_multipliers: Dict of thermal level -> interval multiplier.
+        - check_interval: Seconds between temperature checks.
+        """
+        self.monitor = monitor
+        self.idle_after = idle_after
+        self.warm_c = warm_c
+        self.hot_c = hot_c
+        self.hysteresis_c = hysteresis_c
+        self.idle_multiplier = idle_multiplier
+        self.thermal_multipliers = thermal_multipliers or {NORMAL: 1.0, WARM: 2.0, HOT: 4.0}
+        self.check_interval = check_interval
+
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.last_activity = time.monotonic()
+        self.idle = False
+        self.thermal_level = NORMAL
+        self.temperature = None
+
+    def add_listener(self, callback):
+        """Call callback(governor) whenever the idle state or thermal level changes."""
+        self.listeners.append(callback)
+
+    def _notify(self):
+        for callback in self.listeners:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"Error applying power state: {e}")
+
+    def notify_activity(self):
+        """Report a proximity trigger; leaves idle mode immediately."""
+        with self.lock:
+            self.last_activity = time.monotonic()
+            changed = self.idle
+            self.idle = False
+        if changed:
+            print("Power governor: activity, back to full rate.")
+            self._notify()
+
+    def _thermal_level_for(self, temperature):
+        """Map a temperature to a thermal level, only stepping down below the threshold minus hysteresis."""
+        if temperature is None:
+            return self.thermal_level
+        if temperature >= self.hot_c:
+            return HOT
+        if self.thermal_level == HOT and temperature >= self.hot_c - self.hysteresis_c:
+            return HOT
+        if temperature >= self.warm_c:
+            return WARM
+        if self.thermal_level >= WARM and temperature >= self.warm_c - self.hysteresis_c:
+            return WARM
+        return NORMAL
+
+    def update(self):
+        """Re-evaluate the idle state and the thermal level."""
+        temperature = self.monitor.get_rpi_temperature_from_file()
+        with self.lock:
+            idle = time.monotonic() - self.last_activity > self.idle_after
+            level = self._thermal_level_for(temperature)
+            changed = idle != self.idle or level != self.thermal_level
+            self.idle = idle
+            self.thermal_level = level
+            self.temperature = temperature
+        if changed:
+            print(f"Power governor: idle={idle}, thermal level={level}, temperature={temperature} C.")
+            self._notify()
+
+    def run(self):
+        """Governor loop, run as a supervised worker."""
+        while True:
+            heartbeat()
+            self.update()
+            time.sleep(self.check_interval)
+
+    def multiplier(self):
+        with self.lock:
+            idle = self.idle_multiplier if self.idle else 1.0
+            return max(idle, self.thermal_multipliers.get(self.thermal_level, 1.0))
+
+    def scale(self, seconds):
+        """Stretch a loop interval according to the current idle and thermal state."""
+        return seconds * self.multiplier()
+
+    def capture_allowed(self):
+        return self.thermal_level < WARM
+
+    def streaming_allowed(self):
+        return self.thermal_level < HOT
+
+    def stats(self):
+        with self.lock:
+            return {
+                "idle": self.idle,
+                "thermal_level": self.thermal_level,
+                "temperature": self.temperature,
+                "seconds_since_activity": round(time.monotonic() - self.last_activity, 1),
+            }
+
+
+# Shared governor for the whole process
+power_governor = PowerGovernor(
+    SystemMonitor(),
+    idle_after=config.POWER_IDLE_AFTER,
+    warm_c=config.THERMAL_WARM_C,
+    hot_c=config.THERMAL_HOT_C,
+    idle_multiplier=config.POWER_IDLE_MULTIPLIER,
+)
@@ -0,0 +1,157 @@
+import threading
+import time
+import traceback
+
+_local = threading.local()
+
+
+class WorkerRetired(BaseException):
+    """
+    Raised inside a worker thread that was replaced after a stall.
+    Not an Exception, so the worker's own error handling (e.g. parking the
+    servo) does not run next to its replacement.
+    """
+
+
+def heartbeat():
+    """
+    Report progress from a supervised worker loop. Call once per iteration.
+    Does nothing in threads that are not supervised. A thread that was
+    declared stalled and replaced gets WorkerRetired here, so it stops as
+    soon as it wakes up instead of running next to its replacement.
+    """
+    worker = getattr(_local, "worker", None)
+    if worker is None:
+        return
+    if _local.generation != worker.generation:
+        raise WorkerRetired(worker.name)
+    worker.last_beat = time.monotonic()
+
+
+class Worker:
+    """A supervised thread: its target, latency budget and restart history."""
+
+    def __init__(self, name, target, args=(), budget=30.0):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.budget = budget
+        self.thread = None
+        self.generation = 0
+        self.started_at = 0.0
+        self.last_beat = 0.0
+        self.next_start = 0.0
+        self.backoff = 0.0
+        self.restarts = 0
+        self.crashes = 0
+        self.stalls = 0
+        self.last_error = None
+
+    def run(self, generation):
+        _local.worker = self
+        _local.generation = generation
+        try:
+            self.target(*self.args)
+            print(f"Worker {self.name} exited.")
+        except WorkerRetired:
+            print(f"Stalled worker {self.name} woke up and was retired.")
+        except Exception as e:
+            if generation == self.generation:
+                self.crashes += 1
+                self.last_error = str(e)
+            print(f"Worker {self.name} crashed: {e}")
+            traceback.print_exc()
+
+
+class Supervisor:
+    """
+    Starts worker threads, watches their heartbeats and restarts them.
+
+    A worker is restarted when its thread has exited (crash or unexpected
+    return) or when it has not called heartbeat() within its latency budget.
+    Python threads cannot be killed, so a stalled thread is abandoned and
+    retired at its next heartbeat. Restarts back off exponentially, and the
+    backoff resets once a worker has stayed healthy for `healthy_after` seconds.
+    """
+
+    def __init__(self, check_interval=1.0, initial_backoff=1.0, max_backoff=60.0, healthy_after=60.0):
+        self.check_interval = check_interval
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.healthy_after = healthy_after
+        self.workers = {}
+        self.lock = threading.Lock()
+        self.running = False
+
+    def add(self, name, target, args=(), budget=30.0):
+        """Register a worker loop. `budget` is the longest allowed gap between heartbeats in seconds."""
+        with self.lock:
+            self.workers[name] = Worker(name, target, args, budget)
+
+    def _start(self, worker):
+        worker.generation += 1
+        worker.started_at = time.monotonic()
+        worker.last_beat = worker.started_at
+        worker.thread = threading.Thread(
+            target=worker.run, args=(worker.generation,), name=worker.name, daemon=True
+        )
+        worker.thread.start()
+
+    def _schedule_restart(self, worker, now):
+        worker.backoff = self.initial_backoff if worker.backoff == 0 else min(worker.backoff * 2, self.max_backoff)
+        worker.next_start = now + worker.backoff
+        worker.thread = None
+        print(f"Restarting {worker.name} in {worker.backoff:.1f} s.")
+
+    def check(self):
+        """Inspect every worker once, restarting the ones that crashed or stalled."""
+        now = time.monotonic()
+        with self.lock:
+            for worker in self.workers.values():
+                if worker.thread is None:
+                    if now >= worker.next_start:
+                        if worker.generation > 0:
+                            worker.restarts += 1
+                        self._start(worker)
+                    continue
+
+                if not worker.thread.is_alive():
+                    self._schedule_restart(worker, now)
+                elif now - worker.last_beat > worker.budget:
+                    worker.stalls += 1
+                    print(f"Worker {worker.name} stalled: no heartbeat for {now - worker.last_beat:.1f} s.")
+                    # The old thread is left behind and retired at its next heartbeat
+                    worker.generation += 1
+                    self._schedule_restart(worker, now)
+                elif now - worker.started_at > self.healthy_after:
+                    worker.backoff = 0.0
+
+    def run(self):
+        """Start all workers and supervise them until stop() is called."""
+        self.running = True
+        while self.running:
+            self.check()
+            time.sleep(self.check_interval)
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        """Return restart, crash and stall counts of every worker."""
+        now = time.monotonic()
+        with self.lock:
+            return {
+                name: {
+                    "alive": worker.thread is not None and worker.thread.is_alive(),
+                    "restarts": worker.restarts,
+                    "crashes": worker.crashes,
+                    "stalls": worker.stalls,
+                    "last_heartbeat_age": round(now - worker.last_beat, 2) if worker.thread else None,
+                    "last_error": worker.last_error,
+                }
+                for name, worker in self.workers.items()
+            }
+
+
+# Shared supervisor for the whole process
+supervisor = Supervisor()
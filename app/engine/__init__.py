@@ -1,15 +1,44 @@
 from .database import Database
+from .cache import BinLevelCache
+from .rollups import RollupEngine
+from .forecast import FillForecaster
 import json
+import config
 
 db = Database(
     '139.99.97.250',
     'ebasura',
     'kWeGKUsHM1nNIf-P',
-    'monitoring_system'
+    'monitoring_system',
+    connect_timeout=config.DB_CONNECT_TIMEOUT,
+    read_timeout=config.DB_READ_TIMEOUT,
 )
 
-def fetch_waste_bin_levels(bin_id):
+# Local copy of waste_level rows, kept current by update_bin_level
+bin_level_cache = BinLevelCache(ttl=config.BIN_LEVEL_CACHE_TTL)
+
+# Per-minute and per-hour aggregates of the fill level history
+rollup_engine = RollupEngine(
+    db,
+    raw_interval=config.RAW_FILL_LEVEL_INTERVAL,
+    raw_retention_days=config.RAW_FILL_LEVEL_RETENTION_DAYS,
+    rollup_retention_days=config.ROLLUP_RETENTION_DAYS,
+)
+
+# Fill rate and time until THRESHOLD_PERCENTAGE per bin
+fill_forecaster = FillForecaster(
+    config.INITIAL_DEPTH_CM,
+    config.THRESHOLD_PERCENTAGE,
+    publish_interval=config.FORECAST_PUBLISH_INTERVAL,
+)
+
+def fetch_waste_bin_levels(bin_id, use_cache=True):
     global db
+    if use_cache:
+        rows = bin_level_cache.get(bin_id)
+        if rows is not None:
+            return rows
+
     sql = """
     SELECT * 
     FROM waste_level
@@ -20,6 +49,7 @@ def fetch_waste_bin_levels(bin_id):
     rows = db.fetch(sql, args)  
 
     if rows:
+        bin_level_cache.load(bin_id, rows)
         return rows
     else:
-        return [] 
+        return []
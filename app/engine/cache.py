@@ -0,0 +1,69 @@
+import threading
+import time
+
+
+class BinLevelCache:
+    """
+    In-memory cache of `waste_level` rows keyed by (bin_id, waste_type_id).
+
+    The device is the only writer of these rows, so writes are applied to the
+    cached rows in place and reads never need the network. Each bin is still
+    reloaded from the database once its entries are older than `ttl` seconds,
+    which picks up anything changed on the server side.
+    """
+
+    def __init__(self, ttl=300.0):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.rows = {}          # (bin_id, waste_type_id) -> row dict
+        self.loaded_at = {}     # bin_id -> time the bin was loaded from the database
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, bin_id):
+        """Return copies of the cached rows for a bin, or None if missing or expired."""
+        with self.lock:
+            loaded_at = self.loaded_at.get(bin_id)
+            if loaded_at is None or time.monotonic() - loaded_at > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return [dict(row) for key, row in self.rows.items() if key[0] == bin_id]
+
+    def load(self, bin_id, rows):
+        """Replace the cached rows of a bin with rows fetched from the database."""
+        with self.lock:
+            for key in [key for key in self.rows if key[0] == bin_id]:
+                del self.rows[key]
+            for row in rows:
+                self.rows[(bin_id, row['waste_type_id'])] = dict(row)
+            self.loaded_at[bin_id] = time.monotonic()
+
+    def update(self, bin_id, waste_type_id, values):
+        """
+        Apply a write to a cached row in place.
+        If the row is not cached the bin is invalidated so the next read reloads it.
+        """
+        with self.lock:
+            row = self.rows.get((bin_id, waste_type_id))
+            if row is None:
+                self.loaded_at.pop(bin_id, None)
+                return False
+            row.update(values)
+            return True
+
+    def invalidate(self, bin_id=None):
+        """Drop one bin, or every bin when no id is given."""
+        with self.lock:
+            if bin_id is None:
+                self.rows.clear()
+                self.loaded_at.clear()
+            else:
+                for key in [key for key in self.rows if key[0] == bin_id]:
+                    del self.rows[key]
+                self.loaded_at.pop(bin_id, None)
+
+    def stats(self):
+        """Return hit and miss counters."""
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.rows)}
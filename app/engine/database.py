@@ -1,12 +1,14 @@
 import pymysql # type: ignore
 
 class Database:
-    def __init__(self, host, user, password, db):
-        """Initialize the Database connection."""
+    def __init__(self, host, user, password, db, connect_timeout=10, read_timeout=None):
+        """Initialize the Database connection. Timeouts are in seconds, None waits forever."""
         self.host = host
         self.user = user
         self.password = password
         self.db = db
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
 
     def connect(self):
         """Create a new database connection."""
@@ -15,6 +17,9 @@ class Database:
             user=self.user,
             password=self.password,
             db=self.db,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            write_timeout=self.read_timeout,
             cursorclass=pymysql.cursors.DictCursor
         )
 
@@ -32,6 +37,20 @@ class Database:
         finally:
             connection.close()
 
+    def execute_many(self, query, args_list):
+        """Execute a query for each set of arguments in a single round trip and transaction."""
+        try:
+            connection = self.connect()
+            with connection.cursor() as cursor:
+                cursor.executemany(query, args_list)
+            connection.commit()
+            return True
+        except Exception as e:
+            print(f"Error: {str(e)}")
+            return False
+        finally:
+            connection.close()
+
     def fetch(self, query, args=None):
         """Execute a SELECT query and fetch the results."""
         try:
@@ -60,6 +79,20 @@ class Database:
         finally:
             connection.close()
 
+    def has_columns(self, table, columns):
+        """
+        Check that a table exists with all the given columns.
+        Returns True or False, or None if the database could not be queried.
+        """
+        rows = self.fetch(
+            "SELECT COLUMN_NAME AS name FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,),
+        )
+        if rows is None:
+            return None
+        return set(columns) <= {row["name"] for row in rows}
+
     def update(self, query, args=None):
         """Execute an UPDATE query."""
         return self.execute(query, args)
@@ -0,0 +1,128 @@
+import datetime
+import math
+import threading
+import time
+
+MAX_FORECAST_SECONDS = 365 * 24 * 3600
+
+
+class FillState:
+    """Smoothed fill percentage and fill rate of one bin compartment."""
+
+    def __init__(self, timestamp, level):
+        self.timestamp = timestamp
+        self.level = level      # Smoothed fill percentage
+        self.rate = 0.0         # Smoothed fill rate in percentage points per second
+        self.samples = 1
+
+
+class FillForecaster:
+    """
+    Estimates how fast each bin fills and when it will reach the threshold.
+
+    Uses double exponential smoothing (Holt's method) with smoothing factors
+    derived from time constants, so irregular sample intervals are handled
+    and every sample is an O(1) update of two numbers per
+    (bin_id, waste_type_id) with no history kept. A sudden drop in level is
+    treated as the bin being emptied and restarts the estimate.
+    """
+
+    def __init__(self, depth_cm, threshold_percentage, level_time_constant=300.0,
+                 rate_time_constant=1800.0, empty_drop_percentage=20.0, publish_interval=60.0):
+        """
+        Parameters:
+        - depth_cm: Distance from the sensor to the bottom of an empty bin.
+        - threshold_percentage: Fill percentage at which the bin counts as full.
+        - level_time_constant: Seconds over which level readings are smoothed.
+        - rate_time_constant: Seconds over which the fill rate is smoothed.
+        - empty_drop_percentage: Drop in fill percentage treated as an emptied bin.
+        - publish_interval: Minimum seconds between database publishes per bin.
+        """
+        self.depth_cm = depth_cm
+        self.threshold_percentage = threshold_percentage
+        self.level_time_constant = level_time_constant
+        self.rate_time_constant = rate_time_constant
+        self.empty_drop_percentage = empty_drop_percentage
+        self.publish_interval = publish_interval
+        self.lock = threading.Lock()
+        self.states = {}        # (bin_id, waste_type_id) -> FillState
+        self.last_publish = {}  # (bin_id, waste_type_id) -> time of the last publish
+
+    def fill_percentage(self, distance):
+        """Convert a sensor distance in cm into a fill percentage (0-100)."""
+        percentage = (self.depth_cm - distance) / self.depth_cm * 100.0
+        return max(0.0, min(100.0, percentage))
+
+    def add_sample(self, bin_id, waste_type_id, distance, now=None):
+        """Fold a distance reading into the estimate and return the current forecast."""
+        now = time.time() if now is None else now
+        level = self.fill_percentage(distance)
+        key = (bin_id, waste_type_id)
+
+        with self.lock:
+            state = self.states.get(key)
+            if state is None or state.level - level > self.empty_drop_percentage:
+                state = FillState(now, level)
+                self.states[key] = state
+            else:
+                dt = now - state.timestamp
+                if dt > 0:
+                    alpha = 1.0 - math.exp(-dt / self.level_time_constant)
+                    beta = 1.0 - math.exp(-dt / self.rate_time_constant)
+                    predicted = state.level + state.rate * dt
+                    new_level = alpha * level + (1 - alpha) * predicted
+                    state.rate = beta * (new_level - state.level) / dt + (1 - beta) * state.rate
+                    state.level = new_level
+                    state.timestamp = now
+                    state.samples += 1
+
+            return self._forecast(state)
+
+    def forecast(self, bin_id, waste_type_id):
+        """Return the latest forecast of a bin, or None before its first sample."""
+        with self.lock:
+            state = self.states.get((bin_id, waste_type_id))
+            return self._forecast(state) if state is not None else None
+
+    def forecasts(self, bin_id):
+        """Return the latest forecast of every compartment of a bin, by waste type id."""
+        with self.lock:
+            return {
+                waste_type_id: self._forecast(state)
+                for (state_bin_id, waste_type_id), state in self.states.items()
+                if state_bin_id == bin_id
+            }
+
+    def _forecast(self, state):
+        if state.level >= self.threshold_percentage:
+            seconds_to_threshold = 0.0
+        elif state.rate > 0:
+            seconds_to_threshold = (self.threshold_percentage - state.level) / state.rate
+        else:
+            seconds_to_threshold = None  # Not filling
+
+        # Rates close to zero give forecasts too far out to be meaningful
+        if seconds_to_threshold is not None and seconds_to_threshold > MAX_FORECAST_SECONDS:
+            seconds_to_threshold = None
+
+        predicted_full_at = None
+        if seconds_to_threshold is not None:
+            predicted_full_at = datetime.datetime.fromtimestamp(state.timestamp + seconds_to_threshold)
+
+        return {
+            "fill_percentage": round(state.level, 2),
+            "fill_rate_per_hour": round(state.rate * 3600.0, 3),
+            "hours_to_threshold": round(seconds_to_threshold / 3600.0, 2) if seconds_to_threshold is not None else None,
+            "predicted_full_at": predicted_full_at,
+        }
+
+    def due_for_publish(self, bin_id, waste_type_id, now=None):
+        """Return True if the forecast of a bin should be written to the database now."""
+        now = time.time() if now is None else now
+        key = (bin_id, waste_type_id)
+        with self.lock:
+            last = self.last_publish.get(key)
+            if last is not None and now - last < self.publish_interval:
+                return False
+            self.last_publish[key] = now
+            return True
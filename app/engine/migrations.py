@@ -0,0 +1,425 @@
+import argparse
+import datetime
+
+# Months of empty partitions kept ahead of the current month
+PARTITIONS_AHEAD = 3
+
+VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT NOT NULL PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at DATETIME NOT NULL
+)
+"""
+
+# History tables for fresh databases. They are partitioned by month on
+# `timestamp` by a later migration; MySQL requires the partitioning column in
+# every unique key, so the primary key is already (id, timestamp).
+BIN_FILL_LEVELS = """
+CREATE TABLE `{table}` (
+    id BIGINT NOT NULL AUTO_INCREMENT,
+    bin_id INT NOT NULL,
+    waste_type INT NOT NULL,
+    `timestamp` DATETIME NOT NULL,
+    fill_level FLOAT NOT NULL,
+    PRIMARY KEY (id, `timestamp`),
+    KEY idx_bin_type_time (bin_id, waste_type, `timestamp`)
+) ENGINE=InnoDB
+"""
+
+WASTE_DATA = """
+CREATE TABLE `{table}` (
+    id BIGINT NOT NULL AUTO_INCREMENT,
+    bin_id INT NOT NULL,
+    waste_type_id INT NOT NULL,
+    image_url MEDIUMTEXT,
+    confidence FLOAT,
+    `timestamp` DATETIME NOT NULL,
+    PRIMARY KEY (id, `timestamp`),
+    KEY idx_bin_time (bin_id, `timestamp`)
+) ENGINE=InnoDB
+"""
+
+
+def table_exists(cursor, table):
+    cursor.execute(
+        "SELECT COUNT(*) AS n FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,),
+    )
+    return cursor.fetchone()["n"] > 0
+
+
+def column_exists(cursor, table, column):
+    cursor.execute(
+        "SELECT COUNT(*) AS n FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table, column),
+    )
+    return cursor.fetchone()["n"] > 0
+
+
+def column_type(cursor, table, column):
+    """Data type of a column in lower case (e.g. 'datetime'), None if it does not exist."""
+    cursor.execute(
+        "SELECT DATA_TYPE AS type FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table, column),
+    )
+    row = cursor.fetchone()
+    return row["type"].lower() if row else None
+
+
+def index_exists(cursor, table, index):
+    cursor.execute(
+        "SELECT COUNT(*) AS n FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+        (table, index),
+    )
+    return cursor.fetchone()["n"] > 0
+
+
+def partitions_of(cursor, table):
+    """Return the (name, description) of every partition of a table, in order; empty if unpartitioned."""
+    cursor.execute(
+        "SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS description FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION",
+        (table,),
+    )
+    return [(row["name"], row["description"]) for row in cursor.fetchall()]
+
+
+def next_month(month):
+    return (month.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+
+
+def month_partition(month, function="TO_DAYS"):
+    """Partition holding the rows of the month starting at `month`; `function` as returned by partition_function."""
+    return f"PARTITION p{month:%Y%m} VALUES LESS THAN ({function}('{next_month(month):%Y-%m-%d}'))"
+
+
+def partition_function(cursor, table):
+    """
+    Function mapping `timestamp` to the partition range of a table. MySQL only
+    accepts TO_DAYS on DATE/DATETIME and UNIX_TIMESTAMP on TIMESTAMP columns.
+    """
+    kind = column_type(cursor, table, "timestamp")
+    if kind in ("date", "datetime"):
+        return "TO_DAYS"
+    if kind == "timestamp":
+        return "UNIX_TIMESTAMP"
+    raise RuntimeError(f"{table}: cannot partition by month on a `timestamp` column of type {kind}")
+
+
+def partition_end(name):
+    """First day after the month held by monthly partition `name` (pYYYYMM); None for p_future."""
+    try:
+        return next_month(datetime.datetime.strptime(name, "p%Y%m").date())
+    except ValueError:
+        return None
+
+
+def partition_clause(first_month, last_month, function="TO_DAYS"):
+    """PARTITION BY clause with one partition per month from first_month to last_month plus a catch-all."""
+    parts = []
+    month = first_month.replace(day=1)
+    while month <= last_month:
+        parts.append(month_partition(month, function))
+        month = next_month(month)
+    parts.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+    return f"PARTITION BY RANGE ({function}(`timestamp`)) (\n    " + ",\n    ".join(parts) + "\n)"
+
+
+def months_ahead(today=None):
+    month = (today or datetime.date.today()).replace(day=1)
+    for _ in range(PARTITIONS_AHEAD):
+        month = next_month(month)
+    return month
+
+
+def primary_key_of(cursor, table):
+    cursor.execute(
+        "SELECT COLUMN_NAME AS name FROM information_schema.KEY_COLUMN_USAGE "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_NAME = 'PRIMARY' "
+        "ORDER BY ORDINAL_POSITION",
+        (table,),
+    )
+    return [row["name"] for row in cursor.fetchall()]
+
+
+def unique_keys_without(cursor, table, column):
+    """Names of the unique secondary keys of a table that do not contain `column`."""
+    cursor.execute(
+        "SELECT INDEX_NAME AS name, SUM(COLUMN_NAME = %s) AS has_column FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND NON_UNIQUE = 0 AND INDEX_NAME <> 'PRIMARY' "
+        "GROUP BY INDEX_NAME",
+        (column, table),
+    )
+    return [row["name"] for row in cursor.fetchall() if not row["has_column"]]
+
+
+def rebuild_partitioned(cursor, table, index, index_columns):
+    """
+    Recreate a history table partitioned by month and copy its rows over.
+
+    The copy is made with CREATE TABLE ... LIKE, so every column keeps its
+    type and rows keep their ids. DATETIME columns are partitioned on
+    TO_DAYS, TIMESTAMP columns on UNIX_TIMESTAMP. `timestamp` is appended to the primary key
+    and the composite index `index` is added. Foreign keys are not copied,
+    partitioned tables cannot have them.
+
+    The copy runs in one statement and the tables are swapped with an atomic
+    RENAME; rows written in between stay behind in <table>_unpartitioned,
+    which is kept for the operator to check and drop. Run with the sorting
+    service stopped.
+    """
+    if partitions_of(cursor, table):
+        return
+
+    function = partition_function(cursor, table)
+    blocking = unique_keys_without(cursor, table, "timestamp")
+    if blocking:
+        raise RuntimeError(f"{table}: unique keys {', '.join(blocking)} must include `timestamp` to partition")
+
+    first_month = datetime.date.today()
+    cursor.execute(f"SELECT MIN(`timestamp`) AS first FROM `{table}`")
+    first = cursor.fetchone()["first"]
+    if first is not None:
+        first_month = min(first_month, first.date())
+
+    staging = f"{table}_partitioned"
+    cursor.execute(f"DROP TABLE IF EXISTS `{staging}`")
+    cursor.execute(f"CREATE TABLE `{staging}` LIKE `{table}`")
+
+    primary_key = primary_key_of(cursor, staging)
+    if primary_key and "timestamp" not in primary_key:
+        columns = ", ".join(f"`{column}`" for column in primary_key + ["timestamp"])
+        cursor.execute(f"ALTER TABLE `{staging}` DROP PRIMARY KEY, ADD PRIMARY KEY ({columns})")
+    if not index_exists(cursor, staging, index):
+        columns = ", ".join(f"`{column}`" for column in index_columns)
+        cursor.execute(f"ALTER TABLE `{staging}` ADD KEY `{index}` ({columns})")
+    cursor.execute(f"ALTER TABLE `{staging}` {partition_clause(first_month, months_ahead(), function)}")
+
+    # Same column order as the original, ids included
+    cursor.execute(f"INSERT INTO `{staging}` SELECT * FROM `{table}`")
+    cursor.execute(f"RENAME TABLE `{table}` TO `{table}_unpartitioned`, `{staging}` TO `{table}`")
+    print(f"Partitioned {table}; the original table is kept as {table}_unpartitioned.")
+
+
+# Migrations. Each step checks the current schema first, so a migration that
+# failed halfway can simply be run again.
+
+def create_base_tables(cursor):
+    """Tables the application expects, for fresh databases and local stand-ins."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS waste_type (
+        waste_type_id INT NOT NULL PRIMARY KEY,
+        waste_type_name VARCHAR(50) NOT NULL
+    ) ENGINE=InnoDB
+    """)
+    cursor.execute(
+        "INSERT IGNORE INTO waste_type (waste_type_id, waste_type_name) "
+        "VALUES (1, 'recyclable'), (2, 'non-recyclable')"
+    )
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS waste_level (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        bin_id INT NOT NULL,
+        waste_type_id INT NOT NULL,
+        current_fill_level FLOAT,
+        last_update DATETIME
+    ) ENGINE=InnoDB
+    """)
+    if not table_exists(cursor, "bin_fill_levels"):
+        cursor.execute(BIN_FILL_LEVELS.format(table="bin_fill_levels"))
+    if not table_exists(cursor, "waste_data"):
+        cursor.execute(WASTE_DATA.format(table="waste_data"))
+
+
+def add_waste_level_unique_key(cursor):
+    """One row per (bin_id, waste_type_id); also the index every waste_level query filters on."""
+    if index_exists(cursor, "waste_level", "uq_bin_waste_type"):
+        return
+
+    cursor.execute("""
+    SELECT COUNT(*) AS n FROM (
+        SELECT 1 FROM waste_level GROUP BY bin_id, waste_type_id HAVING COUNT(*) > 1
+    ) AS duplicates
+    """)
+    if cursor.fetchone()["n"] == 0:
+        cursor.execute("ALTER TABLE waste_level ADD UNIQUE KEY uq_bin_waste_type (bin_id, waste_type_id)")
+        return
+
+    # Duplicate rows carry the same values, update_bin_level updates them all
+    # at once, so keeping any one of them is enough. CREATE TABLE ... LIKE does
+    # not copy foreign keys; the original is kept as waste_level_old so they
+    # can be checked and added back by hand before it is dropped.
+    if table_exists(cursor, "waste_level_old"):
+        raise RuntimeError("waste_level_old exists from an earlier run; check it and drop it first")
+    print("Removing duplicate waste_level rows.")
+    cursor.execute("DROP TABLE IF EXISTS waste_level_dedup")
+    cursor.execute("CREATE TABLE waste_level_dedup LIKE waste_level")
+    cursor.execute("ALTER TABLE waste_level_dedup ADD UNIQUE KEY uq_bin_waste_type (bin_id, waste_type_id)")
+    cursor.execute("INSERT IGNORE INTO waste_level_dedup SELECT * FROM waste_level ORDER BY last_update DESC")
+    cursor.execute("RENAME TABLE waste_level TO waste_level_old, waste_level_dedup TO waste_level")
+    print("Deduplicated waste_level; the original table is kept as waste_level_old.")
+
+
+def add_forecast_columns(cursor):
+    """Columns written by publish_forecast in waste_bin_monitor."""
+    if not column_exists(cursor, "waste_level", "fill_rate_per_hour"):
+        cursor.execute("ALTER TABLE waste_level ADD COLUMN fill_rate_per_hour FLOAT NULL")
+    if not column_exists(cursor, "waste_level", "predicted_full_at"):
+        cursor.execute("ALTER TABLE waste_level ADD COLUMN predicted_full_at DATETIME NULL")
+
+
+def create_rollups_table(cursor):
+    """Target of RollupEngine; the primary key is what its upsert relies on."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS bin_fill_level_rollups (
+        bin_id INT NOT NULL,
+        waste_type_id INT NOT NULL,
+        resolution VARCHAR(16) NOT NULL,
+        bucket_start DATETIME NOT NULL,
+        min_level FLOAT NOT NULL,
+        max_level FLOAT NOT NULL,
+        mean_level FLOAT NOT NULL,
+        last_level FLOAT NOT NULL,
+        sample_count INT NOT NULL,
+        PRIMARY KEY (bin_id, waste_type_id, resolution, bucket_start),
+        KEY idx_bin_resolution_start (bin_id, resolution, bucket_start)
+    ) ENGINE=InnoDB
+    """)
+
+
+def partition_bin_fill_levels(cursor):
+    rebuild_partitioned(cursor, "bin_fill_levels", "idx_bin_type_time", ["bin_id", "waste_type", "timestamp"])
+
+
+def partition_waste_data(cursor):
+    rebuild_partitioned(cursor, "waste_data", "idx_bin_time", ["bin_id", "timestamp"])
+
+
+# (version, description, step), applied in order and never changed once released
+MIGRATIONS = [
+    (1, "Create the monitoring tables", create_base_tables),
+    (2, "Unique key on waste_level (bin_id, waste_type_id)", add_waste_level_unique_key),
+    (3, "Fill forecast columns on waste_level", add_forecast_columns),
+    (4, "Create bin_fill_level_rollups", create_rollups_table),
+    (5, "Partition bin_fill_levels by month, index (bin_id, waste_type, timestamp)", partition_bin_fill_levels),
+    (6, "Partition waste_data by month, index (bin_id, timestamp)", partition_waste_data),
+]
+
+# Tables that get a new monthly partition from maintain()
+PARTITIONED_TABLES = ["bin_fill_levels", "waste_data"]
+
+
+class Migrator:
+    """
+    Applies the schema migrations to a database and records them in `schema_migrations`.
+
+    MySQL commits DDL implicitly, so each migration is recorded right after
+    it ran; a migration that failed halfway is retried from the start, and
+    its steps skip whatever already exists.
+    """
+
+    def __init__(self, db, migrations=None):
+        """
+        Parameters:
+        - db: Database to migrate; its connection settings are used directly.
+        - migrations: List of (version, description, step), defaults to MIGRATIONS.
+        """
+        self.db = db
+        self.migrations = migrations or MIGRATIONS
+
+    def applied(self, cursor):
+        cursor.execute(VERSION_TABLE)
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row["version"] for row in cursor.fetchall()}
+
+    def status(self):
+        """Return [(version, description, applied)] for every known migration."""
+        connection = self.db.connect()
+        try:
+            with connection.cursor() as cursor:
+                applied = self.applied(cursor)
+            return [(version, description, version in applied) for version, description, _ in self.migrations]
+        finally:
+            connection.close()
+
+    def migrate(self, target=None):
+        """Apply every pending migration up to `target` (all by default). Returns the versions applied."""
+        connection = self.db.connect()
+        done = []
+        try:
+            with connection.cursor() as cursor:
+                applied = self.applied(cursor)
+                for version, description, step in self.migrations:
+                    if version in applied or (target is not None and version > target):
+                        continue
+                    print(f"Applying migration {version}: {description}")
+                    step(cursor)
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (version, description, applied_at) VALUES (%s, %s, NOW())",
+                        (version, description),
+                    )
+                    connection.commit()
+                    done.append(version)
+        finally:
+            connection.close()
+        return done
+
+    def maintain(self, today=None):
+        """
+        Split the catch-all partition so every partitioned table has monthly
+        partitions PARTITIONS_AHEAD months ahead. Run it monthly, e.g. from cron.
+        """
+        last_month = months_ahead(today)
+        connection = self.db.connect()
+        try:
+            with connection.cursor() as cursor:
+                for table in PARTITIONED_TABLES:
+                    names = [name for name, _ in partitions_of(cursor, table)]
+                    if "p_future" not in names:
+                        continue
+                    months = sorted(name for name in names if name != "p_future")
+                    month = next_month(datetime.datetime.strptime(months[-1], "p%Y%m").date()) if months \
+                        else (today or datetime.date.today()).replace(day=1)
+                    function = partition_function(cursor, table)
+                    parts = []
+                    while month <= last_month:
+                        parts.append(month_partition(month, function))
+                        month = next_month(month)
+                    if not parts:
+                        continue
+                    parts.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+                    cursor.execute(f"ALTER TABLE `{table}` REORGANIZE PARTITION p_future INTO ({', '.join(parts)})")
+                    print(f"Added {len(parts) - 1} partitions to {table}.")
+        finally:
+            connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the monitoring database schema migrations.")
+    parser.add_argument("command", choices=["status", "migrate", "maintain"])
+    parser.add_argument("--target", type=int, help="Stop after this migration version")
+    parser.add_argument("--host", help="Database host, e.g. a local MariaDB; defaults to the application database")
+    parser.add_argument("--user")
+    parser.add_argument("--password")
+    parser.add_argument("--database")
+    args = parser.parse_args()
+
+    from app.engine import db
+    from app.engine.database import Database
+    if args.host:
+        db = Database(args.host, args.user or db.user, args.password or "", args.database or db.db)
+
+    migrator = Migrator(db)
+    if args.command == "status":
+        for version, description, applied in migrator.status():
+            print(f"{version:3d} {'applied' if applied else 'pending':8s} {description}")
+    elif args.command == "migrate":
+        versions = migrator.migrate(args.target)
+        print(f"Applied {len(versions)} migrations." if versions else "Schema is up to date.")
+    else:
+        migrator.maintain()
@@ -0,0 +1,201 @@
+import datetime
+import threading
+import time
+
+from .migrations import partition_end
+
+# Bucket width in seconds for each rollup resolution
+RESOLUTIONS = {
+    "minute": 60,
+    "hour": 3600,
+}
+
+# Columns of bin_fill_level_rollups, in UPSERT order
+COLUMNS = ("bin_id", "waste_type_id", "resolution", "bucket_start",
+           "min_level", "max_level", "mean_level", "last_level", "sample_count")
+
+
+class Bucket:
+    """Running min/max/mean/last of the samples that fall in one time bucket."""
+
+    def __init__(self, start, value):
+        self.start = start
+        self.min = value
+        self.max = value
+        self.sum = value
+        self.count = 1
+        self.last = value
+
+    def add(self, value):
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sum += value
+        self.count += 1
+        self.last = value
+
+    def row(self, bin_id, waste_type_id, resolution):
+        return (
+            bin_id,
+            waste_type_id,
+            resolution,
+            datetime.datetime.fromtimestamp(self.start),
+            self.min,
+            self.max,
+            round(self.sum / self.count, 2),
+            self.last,
+            self.count,
+        )
+
+
+class RollupEngine:
+    """
+    Incrementally aggregates fill-level samples into per-minute and per-hour
+    rollups for each (bin_id, waste_type_id) and pushes them to
+    `bin_fill_level_rollups`. Each sample is O(1); nothing is re-read.
+
+    A minute row is pushed once its minute is over. The open hour row is
+    upserted at the same time, so dashboards see the current hour without
+    waiting for it to end. Raw samples in `bin_fill_levels` can be thinned
+    out with `raw_interval` and expired after `raw_retention_days`.
+    """
+
+    UPSERT = """
+    INSERT INTO bin_fill_level_rollups
+        (bin_id, waste_type_id, resolution, bucket_start, min_level, max_level, mean_level, last_level, sample_count)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        min_level = VALUES(min_level),
+        max_level = VALUES(max_level),
+        mean_level = VALUES(mean_level),
+        last_level = VALUES(last_level),
+        sample_count = VALUES(sample_count)
+    """
+
+    def __init__(self, db, raw_interval=0, raw_retention_days=None, rollup_retention_days=None):
+        """
+        Parameters:
+        - db: Database used to push rollups and expire old rows.
+        - raw_interval: Minimum seconds between raw samples kept per bin (0 keeps all).
+        - raw_retention_days: Days of raw samples to keep, None keeps them forever.
+        - rollup_retention_days: Dict of resolution -> days to keep, None entries keep forever.
+        """
+        self.db = db
+        self.raw_interval = raw_interval
+        self.raw_retention_days = raw_retention_days
+        self.rollup_retention_days = rollup_retention_days or {}
+        self.lock = threading.Lock()
+        self.buckets = {}       # (bin_id, waste_type_id, resolution) -> Bucket
+        self.last_raw = {}      # (bin_id, waste_type_id) -> time of the last raw sample kept
+        self.raw_partitioned = None     # Whether bin_fill_levels is partitioned, None until known
+        self.schema_ready = None        # Whether bin_fill_level_rollups exists, None until known
+        self.partitions_expired_at = 0.0
+
+    def should_store_raw(self, bin_id, waste_type_id, now=None):
+        """Return True if this sample should also be written as a raw row."""
+        now = time.time() if now is None else now
+        key = (bin_id, waste_type_id)
+        with self.lock:
+            last = self.last_raw.get(key)
+            if last is not None and now - last < self.raw_interval:
+                return False
+            self.last_raw[key] = now
+            return True
+
+    def add_sample(self, bin_id, waste_type_id, value, now=None):
+        """Fold a sample into the rollups and push any buckets that just closed."""
+        now = time.time() if now is None else now
+        rows = []
+        hour_closed = False
+        with self.lock:
+            for resolution, width in RESOLUTIONS.items():
+                start = int(now // width) * width
+                key = (bin_id, waste_type_id, resolution)
+                bucket = self.buckets.get(key)
+                if bucket is None or bucket.start != start:
+                    if bucket is not None:
+                        rows.append(bucket.row(bin_id, waste_type_id, resolution))
+                        hour_closed = hour_closed or resolution == "hour"
+                    self.buckets[key] = Bucket(start, value)
+                else:
+                    bucket.add(value)
+
+            # Refresh the open hour whenever a minute closes
+            if rows and not hour_closed:
+                rows.append(self.buckets[(bin_id, waste_type_id, "hour")].row(bin_id, waste_type_id, "hour"))
+
+        if rows:
+            self.push(rows)
+        if hour_closed:
+            self.expire(bin_id)
+
+    def _rollups_table_ready(self):
+        """Check once that the rollups table exists; without it rollups are computed but not stored."""
+        if self.schema_ready is None:
+            ready = self.db.has_columns("bin_fill_level_rollups", COLUMNS)
+            if ready is False:
+                print("Warning: bin_fill_level_rollups is missing, rollups are not stored. "
+                      "Run python -m app.engine.migrations migrate and restart.")
+            self.schema_ready = ready
+        return bool(self.schema_ready)
+
+    def push(self, rows):
+        """Upsert rollup rows in one round trip."""
+        if not self._rollups_table_ready():
+            return
+        if self.db.execute_many(self.UPSERT, rows):
+            print(f"Pushed {len(rows)} rollup rows.")
+        else:
+            print("Failed to push rollup rows.")
+
+    def flush(self):
+        """Push every open bucket, e.g. before shutting down."""
+        with self.lock:
+            rows = [bucket.row(key[0], key[1], key[2]) for key, bucket in self.buckets.items()]
+        if rows:
+            self.push(rows)
+
+    def expire(self, bin_id):
+        """Delete raw samples and rollups of a bin that are past their retention."""
+        if self.raw_retention_days is not None and not self.expire_raw_partitions():
+            self.db.delete(
+                "DELETE FROM bin_fill_levels WHERE bin_id = %s AND timestamp < NOW() - INTERVAL %s DAY",
+                (bin_id, self.raw_retention_days),
+            )
+        for resolution, days in self.rollup_retention_days.items():
+            if days is not None and self._rollups_table_ready():
+                self.db.delete(
+                    "DELETE FROM bin_fill_level_rollups "
+                    "WHERE bin_id = %s AND resolution = %s AND bucket_start < NOW() - INTERVAL %s DAY",
+                    (bin_id, resolution, days),
+                )
+
+    def expire_raw_partitions(self, now=None):
+        """
+        Drop the monthly partitions of bin_fill_levels (see migrations.py) that
+        lie entirely past the raw retention, at most once an hour for all bins.
+        Retention then rounds up to whole months. Returns False if the table
+        is not partitioned, so rows have to be deleted instead.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            if self.raw_partitioned is False:
+                return False
+            if self.raw_partitioned and now - self.partitions_expired_at < 3600:
+                return True
+            self.partitions_expired_at = now
+
+        rows = self.db.fetch(
+            "SELECT PARTITION_NAME AS name FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'bin_fill_levels' AND PARTITION_NAME IS NOT NULL"
+        )
+        if rows is None:
+            return True  # Database unreachable, a DELETE would fail as well
+        self.raw_partitioned = bool(rows)
+        if not rows:
+            return False
+
+        cutoff = datetime.date.fromtimestamp(now) - datetime.timedelta(days=self.raw_retention_days)
+        expired = [row["name"] for row in rows if partition_end(row["name"]) and partition_end(row["name"]) <= cutoff]
+        if expired and self.db.execute(f"ALTER TABLE bin_fill_levels DROP PARTITION {', '.join(expired)}"):
+            print(f"Dropped expired fill level partitions: {', '.join(expired)}")
+        return True
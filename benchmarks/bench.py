@@ -0,0 +1,407 @@
+"""
+Micro-benchmarks for the hot paths of the sorting and monitoring loops.
+
+Run on the target hardware (or a dev machine with the requirements installed):
+
+    python -m benchmarks.bench run --save benchmarks/baselines/pi4.json
+    python -m benchmarks.bench compare benchmarks/baselines/pi4.json
+
+Cameras replay recorded frames (--frames, by default the dataset capture
+directory) or synthetic ones, and the GPIO/SPI hardware is stubbed, see
+benchmarks/stubs.py. compare exits with status 1 when a benchmark got
+significantly slower, so it can gate a release.
+"""
+import argparse
+import gc
+import glob
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import config
+
+# Benchmarks in run order: name -> setup(context) returning the callable to time
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+class Context:
+    """Inputs shared by the benchmarks, plus the lazily imported modules under test."""
+
+    def __init__(self, frames, voltages, readings, db_settings=None):
+        self.frames = frames
+        self.voltages = voltages
+        self.readings = readings
+        self.db_settings = db_settings
+        self._controller = None
+
+    def controller(self):
+        """Import ebasura_controller on stubbed hardware, keeping its logs out of the tree."""
+        if self._controller is None:
+            scratch = tempfile.mkdtemp(prefix="ebasura_bench_")
+            config.EVENT_LOG_DIR = os.path.join(scratch, "event_log")
+            config.CAPTURE_DIR = os.path.join(scratch, "captured_frames")
+            config.CAPTURE_ENABLED = False
+            config.MEMORY_BUDGET_MODE = False
+            import ebasura_controller
+            self._controller = ebasura_controller
+        return self._controller
+
+
+def cycle(items):
+    """Return a function handing out items round-robin, so no single input is cached warm."""
+    state = {"i": 0}
+
+    def next_item():
+        item = items[state["i"] % len(items)]
+        state["i"] += 1
+        return item
+    return next_item
+
+
+@benchmark("preprocess_frame")
+def bench_preprocess_frame(context):
+    controller = context.controller()
+    frame = cycle(context.frames)
+    return lambda: controller.preprocess_frame(frame())
+
+
+@benchmark("recognize_frame")
+def bench_recognize_frame(context):
+    # The classifier itself; going through the inference engine would mostly time its batch window
+    controller = context.controller()
+    classifier = controller.inference_engine.classifier
+    frame = cycle(context.frames)
+    return lambda: classifier.classify(frame())
+
+
+@benchmark("jpeg_data_url")
+def bench_jpeg_data_url(context):
+    # The JPEG + base64 encode websocket_handler sends to viewers
+    controller = context.controller()
+    feed = controller.StationFeed(controller.stations[0])
+    frame = cycle(context.frames)
+
+    def encode():
+        feed.frame = frame()
+        feed.jpeg = None
+        return feed.jpeg_data_url()
+    return encode
+
+
+@benchmark("read_distance")
+def bench_read_distance(context):
+    # Calibration polynomial on synthetic voltages; delay=0 still costs one sleep(0)
+    controller = context.controller()
+    return lambda: controller.read_distance(0, 0)
+
+
+@benchmark("remove_outliers")
+def bench_remove_outliers(context):
+    import waste_bin_monitor
+    readings = cycle(context.readings)
+    return lambda: waste_bin_monitor.remove_outliers(readings())
+
+
+class StubCursor:
+    def __init__(self):
+        self.rows = [{"1": 1}]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, args=None):
+        return 1
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0]
+
+
+class StubConnection:
+    def cursor(self):
+        return StubCursor()
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@benchmark("database_overhead")
+def bench_database_overhead(context):
+    # Cost of the Database wrapper itself, with the server round trip stubbed out
+    from app.engine.database import Database
+
+    class StubDatabase(Database):
+        def connect(self):
+            return StubConnection()
+
+    db = StubDatabase("localhost", "bench", "", "bench")
+    return lambda: db.fetch("SELECT 1")
+
+
+@benchmark("database_roundtrip")
+def bench_database_roundtrip(context):
+    # Connection per query plus a trivial SELECT against a real (local) server
+    if context.db_settings is None:
+        raise RuntimeError("needs --db-host")
+    from app.engine.database import Database
+    db = Database(*context.db_settings)
+    return lambda: db.fetch("SELECT 1")
+
+
+def load_frames(directory, limit=32):
+    """Read up to `limit` recorded frames, or generate synthetic ones if there are none."""
+    import cv2
+    paths = sorted(glob.glob(os.path.join(directory, "**", "*.jpg"), recursive=True)
+                   + glob.glob(os.path.join(directory, "**", "*.png"), recursive=True))[:limit]
+    frames = [frame for frame in (cv2.imread(path) for path in paths) if frame is not None]
+    if frames:
+        return frames, f"{len(frames)} recorded frames from {directory}"
+    return synthetic_frames(), "synthetic frames"
+
+
+def synthetic_frames(count=8, seed=0):
+    """Camera-sized frames with a gradient background and a few blocks, roughly as hard to encode as real ones."""
+    import cv2
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    width, height = config.CAMERA_IDLE_RESOLUTION
+    frames = []
+    for _ in range(count):
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        base = (x * rng.uniform(0.3, 1.0) + y * rng.uniform(0.3, 1.0)) / 2
+        frame = np.dstack([base, np.flipud(base), np.fliplr(base)]).astype(np.uint8)
+        for _ in range(4):
+            x0, y0 = int(rng.integers(0, width - 40)), int(rng.integers(0, height - 40))
+            color = tuple(int(c) for c in rng.integers(0, 256, 3))
+            cv2.rectangle(frame, (x0, y0), (x0 + int(rng.integers(20, 120)), y0 + int(rng.integers(20, 120))),
+                          color, -1)
+        noise = rng.normal(0, 6, frame.shape)
+        frames.append(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    return frames
+
+
+def synthetic_sensor_data(seed=0):
+    """Proximity sensor voltages and ultrasonic reading sets like the ones the monitors see."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    voltages = [float(v) for v in rng.uniform(0.4, 2.8, 256)]
+    readings = []
+    for _ in range(64):
+        sample = rng.normal(rng.uniform(10, 75), 0.5, 20)
+        sample[rng.integers(0, 20, 2)] = rng.uniform(100, 400, 2)  # Echo glitches
+        readings.append([round(float(x), 2) for x in sample])
+    return voltages, readings
+
+
+def time_benchmark(function, rounds, min_round_seconds=0.05, max_number=100000):
+    """
+    Time `function` over `rounds` rounds and return the per-call seconds of each round.
+    The calls per round are calibrated first so every round lasts at least min_round_seconds.
+    """
+    function()  # Warm up caches and lazily allocated buffers
+    number = 1
+    while number < max_number:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        if time.perf_counter() - start >= min_round_seconds:
+            break
+        number *= 2
+
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(number):
+                function()
+            samples.append((time.perf_counter() - start) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return samples, number
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    n = len(ordered)
+    mean = sum(ordered) / n
+    stdev = math.sqrt(sum((x - mean) ** 2 for x in ordered) / (n - 1)) if n > 1 else 0.0
+    return {
+        "median": ordered[n // 2] if n % 2 else (ordered[n // 2 - 1] + ordered[n // 2]) / 2,
+        "mean": mean,
+        "stdev": stdev,
+        "min": ordered[0],
+    }
+
+
+def mann_whitney_greater(baseline, current):
+    """
+    One-sided Mann-Whitney U test that `current` tends to be larger (slower) than `baseline`.
+    Returns the p-value, using the normal approximation with tie and continuity correction.
+    """
+    n1, n2 = len(baseline), len(current)
+    if n1 == 0 or n2 == 0:
+        return 1.0
+    combined = sorted([(x, 0) for x in baseline] + [(x, 1) for x in current])
+
+    # Average ranks over ties
+    ranks = [0.0] * len(combined)
+    tie_term = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        tied = j - i + 1
+        tie_term += tied ** 3 - tied
+        i = j + 1
+
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, combined) if group == 1)
+    u = rank_sum - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def run(names, rounds, frames_dir, db_settings=None):
+    """Run the selected benchmarks and return the results document."""
+    voltages, readings = synthetic_sensor_data()
+    frames, frames_source = load_frames(frames_dir)
+
+    from benchmarks import stubs
+    stubs.install(frames, voltages)
+
+    context = Context(frames, voltages, readings, db_settings)
+    results = {}
+    skipped = {}
+    for name in names:
+        try:
+            function = BENCHMARKS[name](context)
+        except Exception as e:
+            skipped[name] = str(e)
+            print(f"{name:20s} skipped: {e}")
+            continue
+        samples, number = time_benchmark(function, rounds)
+        results[name] = dict(summarize(samples), number=number, samples=samples)
+        print(f"{name:20s} {results[name]['median'] * 1e6:12.1f} us  (+- {results[name]['stdev'] * 1e6:.1f}, "
+              f"{number} calls x {rounds} rounds)")
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": platform.machine(),
+        "node": platform.node(),
+        "python": platform.python_version(),
+        "model": context._controller.model_registry.active if context._controller else None,
+        "frames": frames_source,
+        "rounds": rounds,
+        "benchmarks": results,
+        "skipped": skipped,
+    }
+
+
+def compare(baseline, current, alpha=0.01, threshold=0.05):
+    """
+    Compare two results documents. A benchmark regressed when its median is
+    more than `threshold` slower and the slowdown is significant at `alpha`.
+    Returns the names of the regressed benchmarks.
+    """
+    if baseline.get("machine") != current.get("machine"):
+        print(f"Warning: baseline is from {baseline.get('machine')}, this run from {current.get('machine')}.")
+
+    regressions = []
+    print(f"{'benchmark':20s} {'baseline':>12s} {'current':>12s} {'change':>8s} {'p':>8s}")
+    for name, result in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            print(f"{name:20s} {'-':>12s} {result['median'] * 1e6:10.1f}us  (new)")
+            continue
+        change = result["median"] / base["median"] - 1.0
+        p_slower = mann_whitney_greater(base["samples"], result["samples"])
+        p_faster = mann_whitney_greater(result["samples"], base["samples"])
+        if change > threshold and p_slower < alpha:
+            verdict = "REGRESSION"
+            regressions.append(name)
+        elif change < -threshold and p_faster < alpha:
+            verdict = "faster"
+        else:
+            verdict = ""
+        print(f"{name:20s} {base['median'] * 1e6:10.1f}us {result['median'] * 1e6:10.1f}us "
+              f"{change * 100:+7.1f}% {min(p_slower, p_faster):8.4f} {verdict}")
+
+    for name in baseline["benchmarks"]:
+        if name not in current["benchmarks"]:
+            print(f"{name:20s} not run: {current.get('skipped', {}).get(name, 'not selected')}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks with stored baselines.")
+    parser.add_argument("command", choices=["run", "compare", "list"])
+    parser.add_argument("baseline", nargs="?", help="Baseline JSON to compare against")
+    parser.add_argument("--current", help="Compare this results file instead of running the benchmarks")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("--rounds", type=int, default=20, help="Timed rounds per benchmark")
+    parser.add_argument("--frames", default=config.CAPTURE_DIR, help="Directory of recorded frames")
+    parser.add_argument("--alpha", type=float, default=0.01, help="Significance level for regressions")
+    parser.add_argument("--threshold", type=float, default=0.05, help="Smallest slowdown reported, as a fraction")
+    parser.add_argument("--db-host", help="Also time real queries against this (local) MySQL/MariaDB")
+    parser.add_argument("--db-user", default="root")
+    parser.add_argument("--db-password", default="")
+    parser.add_argument("--db-name", default="monitoring_system")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        print("\n".join(BENCHMARKS))
+        sys.exit(0)
+    if args.command == "compare" and not args.baseline:
+        parser.error("compare needs a baseline file")
+
+    if args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        db_settings = (args.db_host, args.db_user, args.db_password, args.db_name) if args.db_host else None
+        current = run(args.only or list(BENCHMARKS), args.rounds, args.frames, db_settings)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.alpha, args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+        print("No significant regressions.")
@@ -0,0 +1,137 @@
+"""
+Hardware stand-ins so the controller modules can be imported off the Pi.
+
+install() registers fake RPi.GPIO, board, digitalio, busio and
+adafruit_mcp3xxx modules and replaces cv2.VideoCapture with a camera that
+replays recorded frames. Everything else (OpenCV, TFLite, PyMySQL) is the
+real library, so the benchmarks time the same code that runs in the bins.
+"""
+import itertools
+import sys
+import types
+
+
+class FakeGPIO(types.ModuleType):
+    """RPi.GPIO with every call a no-op and inputs always low."""
+
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+
+    class PWM:
+        def __init__(self, pin, frequency):
+            self.pin = pin
+
+        def start(self, duty):
+            pass
+
+        def ChangeDutyCycle(self, duty):
+            pass
+
+        def stop(self):
+            pass
+
+    def __init__(self):
+        super().__init__("RPi.GPIO")
+
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, mode, **kwargs):
+        pass
+
+    def output(self, pin, value):
+        pass
+
+    def input(self, pin):
+        return self.LOW
+
+    def cleanup(self, pin=None):
+        pass
+
+
+class FakeAnalogIn:
+    """MCP3008 channel returning synthetic proximity sensor voltages in turn."""
+
+    voltages = itertools.cycle([0.4])
+
+    def __init__(self, mcp, channel):
+        self.channel = channel
+
+    @property
+    def voltage(self):
+        return next(FakeAnalogIn.voltages)
+
+
+class ReplayCapture:
+    """cv2.VideoCapture replacement that cycles through recorded frames."""
+
+    frames = []
+
+    def __init__(self, index=0, *args):
+        self.index = index
+        self.position = 0
+
+    def isOpened(self):
+        return bool(ReplayCapture.frames)
+
+    def read(self, image=None):
+        frame = ReplayCapture.frames[self.position % len(ReplayCapture.frames)]
+        self.position += 1
+        if image is not None and image.shape == frame.shape:
+            image[...] = frame
+            return True, image
+        return True, frame.copy()
+
+    def set(self, prop, value):
+        return True
+
+    def release(self):
+        pass
+
+
+def install(frames, voltages):
+    """
+    Register the hardware stubs. Must run before importing the controller modules.
+    Parameters:
+    - frames: Frames the fake cameras replay.
+    - voltages: Proximity sensor voltages returned by the fake MCP3008 channels.
+    """
+    import cv2
+
+    gpio = FakeGPIO()
+    rpi = types.ModuleType("RPi")
+    rpi.GPIO = gpio
+    sys.modules["RPi"] = rpi
+    sys.modules["RPi.GPIO"] = gpio
+
+    board = types.ModuleType("board")
+    board.SCK = board.MISO = board.MOSI = board.D8 = None
+    sys.modules["board"] = board
+
+    digitalio = types.ModuleType("digitalio")
+    digitalio.DigitalInOut = lambda pin: None
+    sys.modules["digitalio"] = digitalio
+
+    busio = types.ModuleType("busio")
+    busio.SPI = lambda **kwargs: None
+    sys.modules["busio"] = busio
+
+    mcp3xxx = types.ModuleType("adafruit_mcp3xxx")
+    mcp3008 = types.ModuleType("adafruit_mcp3xxx.mcp3008")
+    mcp3008.MCP3008 = lambda spi, cs: None
+    analog_in = types.ModuleType("adafruit_mcp3xxx.analog_in")
+    analog_in.AnalogIn = FakeAnalogIn
+    sys.modules["adafruit_mcp3xxx"] = mcp3xxx
+    sys.modules["adafruit_mcp3xxx.mcp3008"] = mcp3008
+    sys.modules["adafruit_mcp3xxx.analog_in"] = analog_in
+
+    FakeAnalogIn.voltages = itertools.cycle(voltages)
+    ReplayCapture.frames = list(frames)
+    cv2.VideoCapture = ReplayCapture
@@ -17,3 +17,118 @@ SERVO_PIN=18
 INITIAL_DEPTH_CM = 75.0         # Initial depth of the bin in cm
 THRESHOLD_PERCENTAGE = 85.0     # Threshold percentage
 
+
+# Chute region of interest used for classification, as (x, y, width, height)
+# fractions of the camera frame. None uses the whole frame.
+CHUTE_ROI = None
+
+CAMERA_INDEX = 0
+CAMERA_STREAM_RESOLUTION = (640, 480)   # Used while WebSocket viewers are connected
+CAMERA_IDLE_RESOLUTION = (320, 240)     # Closest common mode to the model input size
+
+# Sorting stations driven by this device. Each station has its own camera,
+# proximity channel on the MCP3008, servo, level sensors and bin id. Add
+# entries to run several chutes from one Pi; they share one inference engine.
+STATIONS = [
+    {
+        "bin_id": BIN_ID,
+        "camera_index": CAMERA_INDEX,
+        "proximity_channel": 0,
+        "servo_pin": SERVO_PIN,
+        "trig_recyclable_bin": TRIG_RECYCLABLE_BIN,
+        "echo_recyclable_bin": ECHO_RECYCLABLE_BIN,
+        "trig_non_recyclable_bin": TRIG_NON_RECYCLABLE_BIN,
+        "echo_non_recyclable_bin": ECHO_NON_RECYCLABLE_BIN,
+    },
+]
+
+INFERENCE_MAX_BATCH = 4         # Frames classified together at most
+INFERENCE_BATCH_WINDOW = 0.01   # Seconds to wait for other cameras' frames (only with several stations)
+INFERENCE_TIMEOUT = 5.0         # Seconds a sorting loop waits for a classification
+
+BIN_LEVEL_CACHE_TTL = 300.0     # Seconds before cached bin levels are re-read from the database
+
+# Fill level history: raw rows in bin_fill_levels are kept at most every
+# RAW_FILL_LEVEL_INTERVAL seconds per bin (0 keeps every sample) and for
+# RAW_FILL_LEVEL_RETENTION_DAYS days (None keeps them forever). Minute and
+# hour rollups are always computed on the device. Only thin out or expire
+# the raw table once nothing reads it anymore; e.g. 60 and 7 cut it 20x.
+RAW_FILL_LEVEL_INTERVAL = 0
+RAW_FILL_LEVEL_RETENTION_DAYS = None
+ROLLUP_RETENTION_DAYS = {"minute": 30, "hour": None}
+
+FORECAST_PUBLISH_INTERVAL = 60.0    # Seconds between fill forecast writes to waste_level per bin
+
+# Highest rate (messages per second) a WebSocket client may request per topic
+WEBSOCKET_TOPIC_MAX_RATES = {
+    "video": 10.0,
+    "predictions": 10.0,
+    "sort_events": 10.0,
+    "bin_levels": 1.0,
+    "health": 1.0,
+}
+
+# Binary event log of classifications and sort actions (python -m app.EventLog replay|stats)
+EVENT_LOG_DIR = 'event_log'
+EVENT_LOG_SEGMENT_RECORDS = 65536   # Records per segment file (48 bytes each)
+EVENT_LOG_MAX_SEGMENTS = 32         # Oldest segments beyond this are deleted
+
+# Training data capture (frames go to CAPTURE_DIR/<label>/)
+CAPTURE_ENABLED = True
+CAPTURE_DIR = 'captured_frames'
+CAPTURE_QUOTA_MB = 512                      # Oldest frames are deleted beyond this
+CAPTURE_WORKERS = 1
+CAPTURE_LOW_CONFIDENCE = 0.85               # Frames below this confidence are always kept
+CAPTURE_HIGH_CONFIDENCE_SAMPLE_RATE = 0.1   # Fraction of confident frames kept
+
+# Two-stage cascade: a tiny presence model decides whether an item is in view
+# before the full classifier runs. Frames without an item are reported as
+# "nothing". This needs a presence model trained on images of the chute,
+# registered with a CASCADE_PRESENCE_LABEL output; none is bundled. The 96x96
+# grayscale models in models/ are 3-class models of unknown label order
+# (class_0..class_2), so the gate refuses them.
+CASCADE_ENABLED = False
+CASCADE_GATE_MODEL = None                   # Registry name of the chute presence model
+CASCADE_PRESENCE_LABEL = "object"
+CASCADE_PRESENCE_THRESHOLD = 0.5
+
+# Database timeouts in seconds. The bin monitors and sorting loops report a
+# heartbeat around every query, so one query must fit in their budget. The
+# read timeout also bounds writes, so a query can block for DB_QUERY_MAX.
+DB_CONNECT_TIMEOUT = 5
+DB_READ_TIMEOUT = 10
+DB_QUERY_MAX = DB_CONNECT_TIMEOUT + 2 * DB_READ_TIMEOUT
+
+# Longest gap in seconds between heartbeats before the supervisor declares a
+# worker stalled and restarts it
+WORKER_BUDGETS = {
+    "bin_monitor": DB_QUERY_MAX + 5.0,      # One query, or up to 12 s throttled sleep + ~6 s sampling
+    "internet_monitor": 20.0,
+    "websocket_server": 10.0,
+    "servo_rotation": DB_QUERY_MAX + 5.0,   # One waste_data insert, or capture + 1 s sensor read + inference
+    "power_governor": 30.0,
+}
+
+# Memory-budget mode for 1-2 GB devices: camera frames are read into a pool of
+# reusable buffers and tracemalloc reports peak memory per subsystem (reported
+# by the "stats" WebSocket command). Queue bounds apply in every mode.
+MEMORY_BUDGET_MODE = False
+FRAME_POOL_SIZE = 4             # Frame buffers per station
+MEMORY_REPORT_INTERVAL = 30.0   # Seconds between tracemalloc samples
+SERVO_QUEUE_SIZE = 4            # Pending servo moves per station
+INFERENCE_QUEUE_SIZE = 16       # Frames waiting for inference
+
+# Power governor: after POWER_IDLE_AFTER seconds without a proximity trigger
+# loop intervals are multiplied by POWER_IDLE_MULTIPLIER and cameras drop to
+# CAMERA_IDLE_FPS. At THERMAL_WARM_C capture is paused and intervals stretch
+# further; at THERMAL_HOT_C viewer video is paused too.
+POWER_IDLE_AFTER = 60.0
+POWER_IDLE_MULTIPLIER = 3.0
+THERMAL_WARM_C = 70.0
+THERMAL_HOT_C = 77.0
+CAMERA_ACTIVE_FPS = 30
+CAMERA_IDLE_FPS = 5
+
+# On-demand sampling profiler, started with the "profile" WebSocket command
+PROFILER_INTERVAL = 0.01        # Seconds between stack samples
+PROFILER_MAX_SECONDS = 60.0     # Longest profile a client can request
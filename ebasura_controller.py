@@ -1,5 +1,3 @@
-import numpy as np
-import tensorflow as tf
 import cv2
 import asyncio
 import websockets
@@ -7,29 +5,52 @@ import json
 import base64
 import RPi.GPIO as GPIO
 import time
-import os
 import threading
 import queue
+import collections
+import itertools
 import config
-from app.engine import db
+from app.engine import db, fetch_waste_bin_levels, fill_forecaster
 import board
 import digitalio
 import busio
 from adafruit_mcp3xxx.mcp3008 import MCP3008
 from adafruit_mcp3xxx.analog_in import AnalogIn
+from app.ModelRegistry import ModelRegistry
+from app.Classifier import Classifier
+from app.InferenceEngine import InferenceEngine
+from app.EventLog import EventLog
+from app.DatasetCapture import DatasetCapture
+from app.Supervisor import supervisor, heartbeat
+from app.MemoryMonitor import FramePool, MemoryMonitor
+from app.PowerGovernor import power_governor
+from app.Profiler import SamplingProfiler
 
 # Initialize SPI bus and MCP3008
 spi = busio.SPI(clock=board.SCK, MISO=board.MISO, MOSI=board.MOSI)
 cs = digitalio.DigitalInOut(board.D8)  # Chip select pin
 mcp = MCP3008(spi, cs)
 
-# Load the TFLite model and allocate tensors for inference
-interpreter = tf.lite.Interpreter(model_path="models/model_unquant.tflite")
-interpreter.allocate_tensors()
-
-# Get input and output details of the model
-input_details = interpreter.get_input_details()
-output_details = interpreter.get_output_details()
+# Load the active TFLite model from the registry. The classifier owns the
+# interpreter and its preallocated preprocessing buffers, and can be replaced
+# at runtime with swap_model() without restarting the process. A single
+# inference engine batches frames from every station's camera. With a single
+# station there are no other cameras to wait for, so frames only batch with
+# requests that are already queued (viewers).
+model_registry = ModelRegistry()
+inference_engine = InferenceEngine(
+    Classifier(model_registry.get(), config.CHUTE_ROI, config.INFERENCE_MAX_BATCH),
+    max_batch=config.INFERENCE_MAX_BATCH,
+    batch_window=config.INFERENCE_BATCH_WINDOW if len(config.STATIONS) > 1 else 0.0,
+    presence_label=config.CASCADE_PRESENCE_LABEL,
+    presence_threshold=config.CASCADE_PRESENCE_THRESHOLD,
+    queue_size=config.INFERENCE_QUEUE_SIZE,
+)
+if config.CASCADE_ENABLED and config.CASCADE_GATE_MODEL:
+    inference_engine.set_gate(
+        Classifier(model_registry.get(config.CASCADE_GATE_MODEL), config.CHUTE_ROI, config.INFERENCE_MAX_BATCH)
+    )
+inference_engine.start()
 
 # Configure GPIO pins for object detection sensor
 GPIO.setmode(GPIO.BCM)
@@ -119,85 +140,221 @@ class ServoController:
         self.pwm.ChangeDutyCycle(0)  # Stop sending signal to hold position
     
     def cleanup(self):
-        # Stop PWM and clean up GPIO pins
+        # Stop PWM and clean up this servo's pin only, other stations keep running
         self.pwm.stop()
-        GPIO.cleanup()
-
-# Instantiate the servo controller and create a command queue
-servo_controller = ServoController(config.SERVO_PIN)
-servo_command_queue = queue.Queue()
-
-# Thread to handle servo commands
-def servo_worker():
-    while True:
-        command = servo_command_queue.get()
-        if command is None:
-            break  # Exit the thread if None is received
-        servo_controller.set_angle(command)
-        servo_command_queue.task_done()
-
-servo_thread = threading.Thread(target=servo_worker, daemon=True)
-servo_thread.start()
-
-# Initialize the webcam (shared instance)
-camera_lock = threading.Lock()
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    print("Error: Could not open webcam.")
-    exit()
+        GPIO.cleanup(self.servo_pin)
+
+# SortingStation groups the hardware of one sorting chute
+class SortingStation:
+    def __init__(self, index, station_config):
+        self.index = index
+        self.bin_id = station_config["bin_id"]
+        self.proximity_channel = station_config["proximity_channel"]
+
+        # Servo controller with its own command queue and worker thread
+        self.servo_controller = ServoController(station_config["servo_pin"])
+        self.servo_command_queue = queue.Queue(maxsize=config.SERVO_QUEUE_SIZE)
+        self.servo_thread = threading.Thread(target=self.servo_worker, daemon=True)
+        self.servo_thread.start()
+
+        # Initialize the station's webcam (shared by the sorting loop and viewers)
+        self.camera_index = station_config["camera_index"]
+        self.camera_lock = threading.Lock()
+        self.cap = cv2.VideoCapture(self.camera_index)
+        if not self.cap.isOpened():
+            print(f"Error: Could not open webcam for station {index}.")
+            exit()
+
+        # Reusable frame buffers in memory-budget mode, allocated up front at the idle resolution
+        self.frame_pool = None
+        if config.MEMORY_BUDGET_MODE:
+            width, height = config.CAMERA_IDLE_RESOLUTION
+            self.frame_pool = FramePool(config.FRAME_POOL_SIZE, (height, width, 3))
+
+        # No viewers at startup, so capture close to the model resolution
+        self.viewer_count = 0
+        self.viewer_lock = threading.Lock()
+        self.set_camera_resolution(config.CAMERA_IDLE_RESOLUTION)
+
+    def servo_worker(self):
+        """
+        Thread to handle servo commands.
+        """
+        while True:
+            command = self.servo_command_queue.get()
+            if command is None:
+                break  # Exit the thread if None is received
+            self.servo_controller.set_angle(command)
+            self.servo_command_queue.task_done()
+
+    def move_servo(self, angle):
+        """
+        Add a servo movement command to the queue.
+        """
+        try:
+            self.servo_command_queue.put_nowait(angle)
+        except queue.Full:
+            # Only the latest position matters, drop the oldest pending move
+            try:
+                self.servo_command_queue.get_nowait()
+                self.servo_command_queue.task_done()
+            except queue.Empty:
+                pass
+            self.servo_command_queue.put_nowait(angle)
+        print(f"Station {self.index}: servo moved to {angle} degrees.")
+
+    def set_camera_resolution(self, resolution):
+        """
+        Ask the camera to deliver frames at the given (width, height).
+        """
+        width, height = resolution
+        with self.camera_lock:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def set_camera_fps(self, fps):
+        """
+        Ask the camera to deliver frames at the given rate; drivers that cannot do so ignore it.
+        """
+        with self.camera_lock:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+
+    def reopen_camera(self):
+        """
+        Release and reopen the webcam after a failed read.
+        """
+        with self.camera_lock:
+            self.cap.release()
+            self.cap = cv2.VideoCapture(self.camera_index)
+        with self.viewer_lock:
+            resolution = config.CAMERA_STREAM_RESOLUTION if self.viewer_count else config.CAMERA_IDLE_RESOLUTION
+        self.set_camera_resolution(resolution)
+        self.set_camera_fps(camera_fps())
+
+    def read_frame(self):
+        """
+        Grab a frame from the station's webcam.
+        In memory-budget mode the frame is read into a pooled buffer; hand it back with release_frame().
+        On a failed read the buffer goes straight back to the pool and the frame is None.
+        """
+        buffer = self.frame_pool.acquire() if self.frame_pool else None
+        with self.camera_lock:
+            if buffer is None:
+                return self.cap.read()
+            try:
+                ret, frame = self.cap.read(image=buffer)
+            except Exception:
+                self.release_frame(buffer)
+                raise
+        if not ret:
+            self.release_frame(buffer)
+            return False, None
+        return ret, frame
+
+    def release_frame(self, frame):
+        """
+        Return a frame from read_frame() to the pool once nothing uses it anymore.
+        """
+        if self.frame_pool:
+            self.frame_pool.release(frame)
+
+    def add_viewer(self):
+        """
+        Switch to the streaming resolution when the first viewer connects.
+        """
+        with self.viewer_lock:
+            self.viewer_count += 1
+            if self.viewer_count == 1:
+                self.set_camera_resolution(config.CAMERA_STREAM_RESOLUTION)
+
+    def remove_viewer(self):
+        """
+        Drop back to the idle resolution when the last viewer leaves.
+        """
+        with self.viewer_lock:
+            self.viewer_count -= 1
+            if self.viewer_count == 0:
+                self.set_camera_resolution(config.CAMERA_IDLE_RESOLUTION)
+
+    def cleanup(self):
+        """
+        Release the webcam and stop the servo.
+        """
+        self.cap.release()  # Release the webcam
+        self.servo_command_queue.put(None)  # Stop the servo thread (blocks while moves are pending)
+        self.servo_thread.join()  # Ensure the servo thread ends
+        self.servo_controller.cleanup()  # Cleanup GPIO pins
+
+# Per-subsystem memory reporting, only sampled in memory-budget mode
+memory_monitor = MemoryMonitor({
+    "stations": ["ebasura_controller.py"],
+    "inference": ["app/Classifier.py", "app/InferenceEngine.py", "app/FramePreprocessor.py", "app/ModelRegistry.py"],
+    "capture": ["app/DatasetCapture.py"],
+    "event_log": ["app/EventLog.py"],
+    "bin_monitor": ["waste_bin_monitor.py"],
+    "database": ["app/engine"],
+}, interval=config.MEMORY_REPORT_INTERVAL)
+if config.MEMORY_BUDGET_MODE:
+    memory_monitor.start()
+
+# Local binary log of every classification and sort action, see app/EventLog.py
+event_log = EventLog(config.EVENT_LOG_DIR, config.EVENT_LOG_SEGMENT_RECORDS, config.EVENT_LOG_MAX_SEGMENTS)
+
+# Background capture of training frames, low-confidence frames first
+dataset_capture = DatasetCapture(
+    config.CAPTURE_DIR,
+    config.CAPTURE_QUOTA_MB * 1024 * 1024,
+    workers=config.CAPTURE_WORKERS,
+    low_confidence=config.CAPTURE_LOW_CONFIDENCE,
+    high_confidence_sample_rate=config.CAPTURE_HIGH_CONFIDENCE_SAMPLE_RATE,
+)
+dataset_capture.enabled = config.CAPTURE_ENABLED
+
+# On-demand profiler across all threads, see the "profile" command
+profiler = SamplingProfiler(config.PROFILER_INTERVAL, config.PROFILER_MAX_SECONDS)
+
+# Instantiate every configured sorting station
+stations = [SortingStation(i, station_config) for i, station_config in enumerate(config.STATIONS)]
+
+# Lower the camera rate while idle and pause capture when the SoC runs warm
+def camera_fps():
+    return config.CAMERA_IDLE_FPS if power_governor.idle else config.CAMERA_ACTIVE_FPS
+
+def apply_power_state(governor):
+    fps = camera_fps()
+    for station in stations:
+        station.set_camera_fps(fps)
+    dataset_capture.enabled = config.CAPTURE_ENABLED and governor.capture_allowed()
+
+power_governor.add_listener(apply_power_state)
 
 # Preprocessing function for a single frame
 def preprocess_frame(frame):
     """
     Preprocess the frame to match the input requirements of the model.
+    Crops to the chute ROI, resizes and normalizes into a reused input buffer.
     """
-    # Convert the image to grayscale if required by the model
-    input_shape = input_details[0]['shape']
-    if input_shape[-1] == 1:
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-    # Resize the frame to match the model input size
-    height, width = int(input_shape[1]), int(input_shape[2])
-    frame_resized = cv2.resize(frame, (width, height))
-
-    # Normalize the frame
-    frame_normalized = frame_resized / 255.0
-
-    # Expand dimensions to match the input shape
-    if input_shape[-1] == 1:
-        input_tensor = np.expand_dims(frame_normalized, axis=-1)  # Add channel dimension for grayscale
-    else:
-        input_tensor = frame_normalized
+    return inference_engine.classifier.preprocessor.process(frame)
 
-    input_tensor = np.expand_dims(input_tensor, axis=0).astype(np.float32)  # Add batch dimension
-    return input_tensor
+def swap_model(name):
+    """
+    Load another registered model and switch inference over to it.
+    The new interpreter is fully initialized before the swap, so in-flight
+    and subsequent frames are never left without a model.
+    """
+    inference_engine.swap(Classifier(model_registry.get(name), config.CHUTE_ROI, config.INFERENCE_MAX_BATCH))
+    model_registry.set_active(name)
+    print(f"Switched to model {name}.")
 
 # Function to run inference on a frame and return predictions
 def recognize_frame(frame):
     """
     Run inference on the frame using the TFLite model and return sorted predictions.
+    The frame is batched with frames from other stations by the inference engine.
+    Returns None if it fails or takes longer than INFERENCE_TIMEOUT.
     """
     try:
-        # Preprocess the frame
-        input_tensor = preprocess_frame(frame)
-
-        # Set input tensor and run inference
-        interpreter.set_tensor(input_details[0]['index'], input_tensor)
-        interpreter.invoke()
-        output_data = interpreter.get_tensor(output_details[0]['index'])
-
-        # Load labels
-        labels = []
-        with open('models/labels.txt', 'r') as f:
-            labels = [line.strip() for line in f.readlines()]
-
-        # Pair each label with its confidence score
-        predictions = {labels[i]: float(output_data[0][i]) for i in range(len(labels))}
-
-        # Sort predictions by confidence, highest first
-        sorted_predictions = sorted(predictions.items(), key=lambda x: x[1], reverse=True)
-
-        return sorted_predictions
+        return inference_engine.classify(frame, timeout=config.INFERENCE_TIMEOUT)
 
     except Exception as e:
         print(f"Error during processing: {str(e)}")
@@ -214,6 +371,8 @@ def waste_data(bin_id, waste_id, image, confidence):
     """
     args_insert = (bin_id, waste_id, image, confidence)
 
+    # The insert may take up to the database timeouts, report progress around it
+    heartbeat()
     try:
         if db.update(query_insert, args_insert):
             print("Waste data inserted successfully.")
@@ -221,56 +380,331 @@ def waste_data(bin_id, waste_id, image, confidence):
             print("Failed to insert waste data.")
     except Exception as e:
         print(f"Error inserting waste data: {e}")
+    heartbeat()
+
+# Events published by the sorting loops, read by WebSocket clients subscribed to "sort_events"
+sort_events = collections.deque(maxlen=100)
+sort_event_seq = itertools.count(1)
+
+def publish_sort_event(station, label, confidence, angle):
+    """
+    Record a sort action so subscribed viewers receive it.
+    """
+    sort_events.append({
+        "seq": next(sort_event_seq),
+        "station": station.index,
+        "bin_id": station.bin_id,
+        "label": label,
+        "confidence": confidence,
+        "angle": angle,
+        "timestamp": time.time(),
+    })
+
+# Health payload shared by the legacy feed and the "health" topic
+def health_status():
+    return {
+        "workers": supervisor.stats(),
+        "power": power_governor.stats(),
+        "servo_online": True,
+        "sensors": {
+            "recyclable_bin": True,
+            "non_recyclable_bin": True,
+            "proximity": True,
+        },
+    }
+
+# StationFeed holds the latest frame of a station, shared by all its viewers
+class StationFeed:
+    def __init__(self, station):
+        self.station = station
+        self.lock = asyncio.Lock()
+        self.frame = None
+        self.predictions = None
+        self.jpeg = None
+        self.captured_at = 0.0
+
+    async def latest(self, max_age, with_predictions=True):
+        """
+        Return the cached frame if it is younger than max_age seconds, capturing a new one otherwise.
+        Predictions and the JPEG encoding are computed at most once per frame.
+        """
+        async with self.lock:
+            if self.frame is None or time.monotonic() - self.captured_at > max_age:
+                ret, frame = await asyncio.to_thread(self.station.read_frame)
+                if not ret:
+                    raise IOError("Failed to grab frame")
+                self.station.release_frame(self.frame)
+                self.frame = frame
+                self.predictions = None
+                self.jpeg = None
+                self.captured_at = time.monotonic()
+
+            if with_predictions and self.predictions is None:
+                try:
+                    self.predictions = await asyncio.wrap_future(inference_engine.submit(self.frame))
+                except Exception as e:
+                    print(f"Error during processing: {str(e)}")
+            return self
+
+    def jpeg_data_url(self):
+        """
+        Encode the current frame as a JPEG data URL, once per frame.
+        """
+        if self.jpeg is None:
+            _, buffer = cv2.imencode('.jpg', self.frame)
+            self.jpeg = "data:image/jpeg;base64," + base64.b64encode(buffer).decode('utf-8')
+        return self.jpeg
+
+station_feeds = {}
+
+def station_feed(station):
+    if station.index not in station_feeds:
+        station_feeds[station.index] = StationFeed(station)
+    return station_feeds[station.index]
+
+# ClientSession tracks what one WebSocket client subscribed to and how often it wants it
+class ClientSession:
+    def __init__(self, websocket, station):
+        self.websocket = websocket
+        self.station = station
+        self.subscriptions = {}     # topic -> [interval in seconds, next send time]
+        self.legacy = True          # Full feed until the client sends its first command
+        self.last_event_seq = sort_events[-1]["seq"] if sort_events else 0
+        self.watching_video = True
+        station.add_viewer()
+
+    def subscribe(self, topic, rate):
+        """
+        Subscribe to a topic at the requested rate (messages per second), clamped to the topic maximum.
+        Returns the granted rate.
+        """
+        rate = max(0.01, min(float(rate), config.WEBSOCKET_TOPIC_MAX_RATES[topic]))
+        self.subscriptions[topic] = [1.0 / rate, 0.0]
+        self.leave_legacy()
+        if topic == "video":
+            self.set_watching_video(True)
+        return rate
+
+    def unsubscribe(self, topic=None):
+        """Unsubscribe from a topic, or from every topic when topic is None."""
+        if topic is None:
+            self.subscriptions.clear()
+        else:
+            self.subscriptions.pop(topic, None)
+        self.leave_legacy()
+        if topic is None or topic == "video":
+            self.set_watching_video(False)
+
+    def leave_legacy(self):
+        """
+        Stop the combined legacy feed; from now on only subscribed topics are sent.
+        """
+        if self.legacy:
+            self.legacy = False
+            self.set_watching_video("video" in self.subscriptions)
+
+    def set_watching_video(self, watching):
+        """
+        Keep the station at streaming resolution only while the client receives video.
+        """
+        if watching and not self.watching_video:
+            self.station.add_viewer()
+        elif not watching and self.watching_video:
+            self.station.remove_viewer()
+        self.watching_video = watching
+
+    def close(self):
+        self.set_watching_video(False)
+
+    async def send(self, topic, data):
+        await self.websocket.send(json.dumps({"topic": topic, "data": data}, default=str))
+
+    async def publish_due(self):
+        """
+        Send every subscribed topic whose interval has elapsed and return the time until the next one.
+        """
+        now = time.monotonic()
+        for topic, schedule in list(self.subscriptions.items()):
+            interval, next_send = schedule
+            if now < next_send:
+                continue
+            schedule[1] = now + power_governor.scale(interval)
+            await self.publish(topic, interval)
+
+        if not self.subscriptions:
+            return 0.1
+        return max(0.0, min(schedule[1] for schedule in self.subscriptions.values()) - time.monotonic())
+
+    async def publish(self, topic, interval):
+        feed = station_feed(self.station)
+        if topic == "video":
+            if not power_governor.streaming_allowed():
+                return  # Video is paused while the SoC is hot
+            await feed.latest(interval, with_predictions=False)
+            await self.send(topic, {"frame": feed.jpeg_data_url()})
+        elif topic == "predictions":
+            await feed.latest(interval)
+            await self.send(topic, {"predictions": feed.predictions})
+        elif topic == "sort_events":
+            events = [event for event in list(sort_events)
+                      if event["seq"] > self.last_event_seq and event["station"] == self.station.index]
+            if events:
+                self.last_event_seq = events[-1]["seq"]
+                await self.send(topic, {"events": events})
+        elif topic == "bin_levels":
+            levels = await asyncio.to_thread(fetch_waste_bin_levels, self.station.bin_id)
+            await self.send(topic, {
+                "bin_id": self.station.bin_id,
+                "levels": levels,
+                "forecasts": fill_forecaster.forecasts(self.station.bin_id),
+            })
+        elif topic == "health":
+            await self.send(topic, health_status())
+
+    async def publish_legacy(self):
+        """
+        Send the original combined frame + predictions + health message.
+        """
+        feed = await station_feed(self.station).latest(0.1)
+        message = {
+            "station": self.station.index,
+            "bin_id": self.station.bin_id,
+            "frame": feed.jpeg_data_url() if power_governor.streaming_allowed() else None,
+            "predictions": feed.predictions,
+            "health_status": health_status(),
+        }
+        await self.websocket.send(json.dumps(message))
+
+# Commands clients can send over the WebSocket connection
+async def handle_command(request, session):
+    """
+    Execute a JSON command received from a WebSocket client and return the reply.
+    """
+    command = request.get("command")
+    # Any command marks a client that speaks the protocol; snapshot-only clients get no stream
+    session.leave_legacy()
+    if command == "subscribe":
+        topic = request.get("topic")
+        if topic is None:
+            return {"command": command, "ok": True, "topic": None}
+        if topic not in config.WEBSOCKET_TOPIC_MAX_RATES:
+            return {"command": command, "ok": False, "error": f"Unknown topic: {topic}"}
+        try:
+            rate = session.subscribe(topic, request.get("rate", 1.0))
+        except (TypeError, ValueError):
+            return {"command": command, "ok": False, "error": "Invalid rate"}
+        return {"command": command, "ok": True, "topic": topic, "rate": rate}
+    if command == "unsubscribe":
+        session.unsubscribe(request.get("topic"))
+        return {"command": command, "ok": True, "topic": request.get("topic")}
+    if command == "snapshot":
+        try:
+            feed = await station_feed(session.station).latest(0.1)
+        except IOError as e:
+            return {"command": command, "ok": False, "error": str(e)}
+        return {"command": command, "ok": True, "frame": feed.jpeg_data_url(), "predictions": feed.predictions}
+    if command == "stats":
+        return {
+            "command": command,
+            "inference": inference_engine.stats(),
+            "capture": dataset_capture.stats(),
+            "memory": memory_monitor.report(),
+            "power": power_governor.stats(),
+            "frame_pools": {station.index: station.frame_pool.stats() for station in stations if station.frame_pool},
+        }
+    if command == "list_models":
+        return {"command": command, "models": model_registry.describe()}
+    if command == "swap_model":
+        try:
+            # Loading a model blocks, keep it off the event loop
+            await asyncio.to_thread(swap_model, request.get("model"))
+            return {"command": command, "ok": True, "active": model_registry.active}
+        except Exception as e:
+            return {"command": command, "ok": False, "error": str(e)}
+    if command == "profile":
+        try:
+            # Sampling blocks for the whole profile, keep it off the event loop
+            profile = await asyncio.to_thread(
+                profiler.profile, request.get("seconds", 10), bool(request.get("lines", False))
+            )
+            return dict(profile, command=command, ok=True)
+        except (RuntimeError, TypeError, ValueError) as e:
+            return {"command": command, "ok": False, "error": str(e)}
+    return {"command": command, "ok": False, "error": "Unknown command"}
+
+async def command_listener(session):
+    """
+    Read commands from a client while its feed keeps streaming.
+    """
+    try:
+        async for message in session.websocket:
+            try:
+                request = json.loads(message)
+            except ValueError:
+                continue
+            if not isinstance(request, dict):
+                continue  # Valid JSON but not a command object
+            response = await handle_command(request, session)
+            await session.websocket.send(json.dumps(response, default=str))
+    except websockets.exceptions.ConnectionClosed:
+        pass
+
+def station_for_path(path):
+    """
+    Pick the station a viewer asked for: ws://host:8765/<index>, default the first one.
+    """
+    try:
+        index = int(path.strip('/') or 0)
+    except ValueError:
+        index = 0
+    return stations[index] if 0 <= index < len(stations) else stations[0]
 
 # WebSocket server for live camera feed and predictions
 async def websocket_handler(websocket, path):
     """
     Handle incoming WebSocket connections to provide live camera feed and predictions.
+
+    Clients get the combined frame + predictions + health feed at about 10 fps
+    until they send their first command, e.g. {"command": "subscribe",
+    "topic": ..., "rate": ...}; from then on they only receive the topics they
+    asked for, at the granted rate. {"command": "subscribe", "topic": null}
+    stops the legacy feed without subscribing to anything.
+    Topics: video, predictions, sort_events, bin_levels, health.
+    {"command": "snapshot"} returns a single frame on demand.
+    {"command": "profile", "seconds": N} returns a collapsed-stack profile of all threads.
     """
+    session = ClientSession(websocket, station_for_path(path))
+    command_task = asyncio.create_task(command_listener(session))
     try:
         while True:
-            with camera_lock:
-                ret, frame = cap.read()
-            if not ret:
-                print("Failed to grab frame")
-                break
-
-            # Run inference on the frame
-            predictions = recognize_frame(frame)
-
-            # Encode the frame as JPEG
-            _, buffer = cv2.imencode('.jpg', frame)
-            frame_data = base64.b64encode(buffer).decode('utf-8')
-            
-            # Prepare the message to send over WebSocket
-            message = {
-                "frame": "data:image/jpeg;base64," + frame_data,
-                "predictions": predictions,
-                "health_status": {
-                    "servo_online": True,
-                    "sensors": {
-                        "recyclable_bin": True,
-                        "non_recyclable_bin": True,
-                        "proximity": True,
-                    },
-                }
-            }
-            
-            # Send the dictionary over the WebSocket connection in JSON format
-            await websocket.send(json.dumps(message))
-
-            await asyncio.sleep(0.1)  # Add a small delay to control frame rate
+            if session.legacy:
+                await session.publish_legacy()
+                delay = power_governor.scale(0.1)  # Add a small delay to control frame rate
+            else:
+                delay = await session.publish_due()
+            await asyncio.sleep(max(delay, 0.01))
     except websockets.exceptions.ConnectionClosed as e:
         print(f"WebSocket connection closed: {e}")
+    except IOError as e:
+        print(e)
+    finally:
+        command_task.cancel()
+        session.close()
 
 # Main function to start the WebSocket server
 async def start_server():
     """
     Start the WebSocket server to provide live data.
     """
+    # Feeds hold asyncio locks bound to the loop that created them; after a
+    # supervisor restart this runs on a new loop, so start with fresh feeds
+    station_feeds.clear()
     async with websockets.serve(websocket_handler, "0.0.0.0", 8765):
         print("WebSocket server started at ws://0.0.0.0:8765")
-        await asyncio.Future()  # Run forever
+        # Run forever, reporting to the supervisor that the event loop is responsive
+        while True:
+            heartbeat()
+            await asyncio.sleep(1)
 
 # Function to run the WebSocket server in a separate thread
 def start_server_thread():
@@ -279,26 +713,6 @@ def start_server_thread():
     """
     asyncio.run(start_server())
 
-# Helper function to handle servo movements
-def move_servo(angle):
-    """
-    Add a servo movement command to the queue.
-    """
-    servo_command_queue.put(angle)
-    print(f"Servo moved to {angle} degrees.")
-
-# Function to save captured frame locally
-def save_frame(frame, label):
-    """
-    Save the captured frame in a directory corresponding to the predicted label.
-    """
-    directory = os.path.join('captured_frames', label)
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-    frame_path = os.path.join(directory, f'captured_{int(time.time())}.jpg')
-    cv2.imwrite(frame_path, frame)
-    print(f"Frame saved to {frame_path}")
-
 # Function to process predictions and return the top label if confidence threshold is met
 def process_predictions(predictions, confidence_threshold=0.7):
     """
@@ -324,36 +738,61 @@ def process_predictions(predictions, confidence_threshold=0.7):
     return label, confidence
 
 # Function to handle the main servo rotation logic
-def servo_rotation():
+def servo_rotation(station):
     """
     Main function to manage servo movements based on object detection and predictions.
+    Runs the sorting loop of one station; start one supervised thread per station.
+    Errors propagate so the supervisor can restart the loop.
     """
+    frame = None
     try:
         while True:
+            heartbeat()  # Report progress to the supervisor
+
+            # The previous frame is no longer used, return it to the pool
+            station.release_frame(frame)
+            frame = None
+
             # Grab frame from webcam
-            with camera_lock:
-                ret, frame = cap.read()
+            capture_start = time.perf_counter()
+            ret, frame = station.read_frame()
+            capture_ms = (time.perf_counter() - capture_start) * 1000.0
             if not ret:
                 print("Failed to grab frame.")
-                break
+                station.reopen_camera()
+                raise IOError(f"Station {station.index}: failed to grab frame")
 
             # Check sensor status
-            sensor_value = read_distance(0, 1.0)
+            sensor_value = read_distance(station.proximity_channel, 1.0)
             print(sensor_value)
 
             # If no object is detected, reset the servo and continue
             if sensor_value >= 120.0:
-                time.sleep(0.5)
+                time.sleep(power_governor.scale(0.5))
                 continue
+            power_governor.notify_activity()
 
             # Object detected, capture and process frame
+            decision_start = time.perf_counter()
             predictions = recognize_frame(frame)
+            inference_ms = (time.perf_counter() - decision_start) * 1000.0
+
+            # Queue the frame for the training set; written in the background
+            if predictions:
+                dataset_capture.submit(frame, predictions[0][0], predictions[0][1])
 
             # Process predictions and handle actions accordingly
             label, confidence = process_predictions(predictions)
             if not label:
+                event_log.append(station.index, station.bin_id, predictions, latencies={
+                    "capture_ms": capture_ms,
+                    "inference_ms": inference_ms,
+                    "total_ms": capture_ms + inference_ms,
+                })
                 continue
 
+            database_start = time.perf_counter()
+
             # Encode frame as base64 to store in the database
             _, buffer = cv2.imencode('.jpg', frame)
             frame_data = base64.b64encode(buffer).decode('utf-8')
@@ -361,37 +800,48 @@ def servo_rotation():
 
             # Move the servo based on the predicted label
             if label == 'recyclable':
-                move_servo(0)  # Move left for recyclable items
+                station.move_servo(0)  # Move left for recyclable items
+                publish_sort_event(station, label, confidence, 0)
                 print("Item sorted to recyclable bin.")
-                # Save the frame under the predicted label
-                # save_frame(frame, label)
                 # Assign waste type and save to the database
                 waste_type = 1 if label == 'recyclable' else 2
-                waste_data(config.BIN_ID, waste_type, image, confidence)
+                waste_data(station.bin_id, waste_type, image, confidence)
                 print("Captured and saved frame.")
             elif label == 'non-recyclable':
-                move_servo(180)  # Move right for non-recyclable items
+                station.move_servo(180)  # Move right for non-recyclable items
+                publish_sort_event(station, label, confidence, 180)
                 print("Item sorted to non-recyclable bin.")
-                # Save the frame under the predicted label
-                # save_frame(frame, label)
                 waste_type = 1 if label == 'recyclable' else 2
-                waste_data(config.BIN_ID, waste_type, image, confidence)
+                waste_data(station.bin_id, waste_type, image, confidence)
                 print("Captured and saved frame.")
             else:
-                move_servo(90)  # Default angle for unrecognized items
+                station.move_servo(90)  # Default angle for unrecognized items
+                publish_sort_event(station, label, confidence, 90)
                 print("Item not recognized. No sorting action taken.")
 
+            # Record the decision in the local event log
+            database_ms = (time.perf_counter() - database_start) * 1000.0
+            event_log.append(
+                station.index,
+                station.bin_id,
+                predictions,
+                confidence,
+                angle=0 if label == 'recyclable' else 180 if label == 'non-recyclable' else 90,
+                latencies={
+                    "capture_ms": capture_ms,
+                    "inference_ms": inference_ms,
+                    "database_ms": database_ms,
+                    "total_ms": capture_ms + (time.perf_counter() - decision_start) * 1000.0,
+                },
+            )
+
             # Reset the servo to default after 2 seconds
             time.sleep(2)
-            move_servo(90)
+            station.move_servo(90)
 
     except Exception as e:
         print(f"An error occurred: {e}")
-    
-    finally:
-        # Cleanup resources
-        cap.release()  # Release the webcam
-        servo_command_queue.put(None)  # Stop the servo thread
-        servo_thread.join()  # Ensure the servo thread ends
-        servo_controller.cleanup()  # Cleanup GPIO pins
-        print("Servo rotation stopped and resources cleaned up.")
+        # Park the servo in its default position before the loop is restarted
+        station.move_servo(90)
+        station.release_frame(frame)
+        raise
@@ -1,56 +1,53 @@
 import RPi.GPIO as GPIO
 import time
-from threading import Thread
-from waste_bin_monitor import recyclable_bin, non_recyclable_bin
+from waste_bin_monitor import station_monitors
+import config
 import sys
 import ebasura_controller
+from app.engine import rollup_engine
+from app.Supervisor import supervisor
 from network_health_led import internet_monitor
+from app.PowerGovernor import power_governor
 
-def run_gpio_bin_level():
-    """Run GPIO bin level measurement in a separate thread."""
-    try:
-        # Start the bin level measurement functions in separate threads
-        recyclable_thread = Thread(target=recyclable_bin)
-        non_recyclable_thread = Thread(target=non_recyclable_bin)
+def register_workers():
+    """Register every long-running loop with the supervisor."""
+    # Bin level measurement of every station, one worker per compartment
+    for index, station in enumerate(config.STATIONS):
+        for target, args in station_monitors(station):
+            waste_type = "recyclable" if args[-1] == config.RECYCLABLE else "non_recyclable"
+            supervisor.add(f"{waste_type}_bin_{index}", target, args, budget=config.WORKER_BUDGETS["bin_monitor"])
+
+    # Internet monitoring
+    supervisor.add("internet_monitor", internet_monitor, budget=config.WORKER_BUDGETS["internet_monitor"])
 
-        recyclable_thread.start()
-        non_recyclable_thread.start()
+    # Integrate with ebasura_controller (e.g., start WebSocket server and servo rotation)
+    supervisor.add("websocket_server", ebasura_controller.start_server_thread,
+                   budget=config.WORKER_BUDGETS["websocket_server"])
+    for station in ebasura_controller.stations:
+        supervisor.add(f"servo_rotation_{station.index}", ebasura_controller.servo_rotation, (station,),
+                       budget=config.WORKER_BUDGETS["servo_rotation"])
 
-        # Wait for both threads to finish
-        recyclable_thread.join()
-        non_recyclable_thread.join()
-    except Exception as e:
-        print(f"Error occurred in GPIO measurement: {e}")
+    # Idle and thermal throttling
+    supervisor.add("power_governor", power_governor.run, budget=config.WORKER_BUDGETS["power_governor"])
 
 
 if __name__ == "__main__":
     try:
-        # Start the GPIO bin level measurement
-        gpio_thread = Thread(target=run_gpio_bin_level)
-        gpio_thread.start()
-
-        # Start the internet monitoring thread
-        internet_monitor_thread = Thread(target=internet_monitor)
-        internet_monitor_thread.start()
-
-        # Integrate with ebasura_controller (e.g., start WebSocket server and servo rotation)
-        ebasura_controller_thread = Thread(target=ebasura_controller.start_server_thread)
-        servo_thread = Thread(target=ebasura_controller.servo_rotation)
-                
-        ebasura_controller_thread.start()
-        servo_thread.start()
-
-        # Wait for all threads to finish
-        gpio_thread.join()
-        internet_monitor_thread.join()
-        ebasura_controller_thread.join()
-        servo_thread.join()
-        
+        # Start all workers and restart any that crash or stall
+        register_workers()
+        supervisor.run()
 
     except KeyboardInterrupt:
         print("Shutting down...")
 
     finally:
+        # Push the rollups of the current minute and hour
+        rollup_engine.flush()
+
+        # Release the cameras and stop the servos
+        for station in ebasura_controller.stations:
+            station.cleanup()
+
         # Cleanup GPIO settings
         GPIO.setwarnings(False)
         GPIO.cleanup()
@@ -1,6 +1,8 @@
 import RPi.GPIO as GPIO
 import time
 import requests
+from app.Supervisor import heartbeat
+from app.PowerGovernor import power_governor
 
 
 def check_internet():
@@ -38,6 +40,7 @@ def internet_monitor():
     """Monitor internet connection and update LED status."""
     try:
         while True:
+            heartbeat()  # Report progress to the supervisor
             # Check internet connection
             connection_status = check_internet()
             GPIO.output(TEST_PIN, GPIO.HIGH)
@@ -53,7 +56,8 @@ def internet_monitor():
                 # Good connection: Turn on green LED
                 set_rgb_color(False, True, False)
 
-            time.sleep(1)  # Check connection status every second for more responsiveness
+            # Check connection status every second for more responsiveness, less often when idle or hot
+            time.sleep(power_governor.scale(1))
     except KeyboardInterrupt:
         print("Exiting internet monitor")
     finally:
@@ -1,6 +1,9 @@
 import RPi.GPIO as GPIO
 import time
-from app.engine import db 
+from app.engine import db, bin_level_cache, rollup_engine, fill_forecaster
+import datetime
+from app.Supervisor import heartbeat
+from app.PowerGovernor import power_governor
 import config
 import statistics
 import numpy as np
@@ -21,8 +24,15 @@ GPIO.setup(ECHO_BIN_ONE, GPIO.IN)
 GPIO.setup(TRIG_BIN_TWO, GPIO.OUT)
 GPIO.setup(ECHO_BIN_TWO, GPIO.IN)
 
+# Setup the level sensors of any additional sorting stations
+for station in config.STATIONS:
+    GPIO.setup(station["trig_recyclable_bin"], GPIO.OUT)
+    GPIO.setup(station["echo_recyclable_bin"], GPIO.IN)
+    GPIO.setup(station["trig_non_recyclable_bin"], GPIO.OUT)
+    GPIO.setup(station["echo_non_recyclable_bin"], GPIO.IN)
 
-def measure_distance_once(trigger, echo, min_distance=2, max_distance=400):
+
+def measure_distance_once(trigger, echo, min_distance=2, max_distance=400, timeout=0.1):
     """
     Measure the distance using an ultrasonic sensor for a single reading.
     Filters out invalid readings by rejecting values outside the expected range.
@@ -31,6 +41,7 @@ def measure_distance_once(trigger, echo, min_distance=2, max_distance=400):
     - echo: GPIO pin number for the echo pin of the sensor
     - min_distance: Minimum valid distance in cm (default is 2 cm)
     - max_distance: Maximum valid distance in cm (default is 400 cm)
+    - timeout: Maximum time to wait for each edge of the echo pulse (in seconds)
     
     Returns the calculated distance in centimeters, or -1 for an invalid reading.
     """
@@ -42,15 +53,20 @@ def measure_distance_once(trigger, echo, min_distance=2, max_distance=400):
     time.sleep(0.00001)
     GPIO.output(trigger, False)
 
-    # Wait for the echo pin to go high (pulse start)
+    # Wait for the echo pin to go high (pulse start), giving up after the timeout
     pulse_start = time.time()
+    start_time = pulse_start
     while GPIO.input(echo) == 0:
         pulse_start = time.time()
+        if pulse_start - start_time > timeout:
+            return -1
 
     # Wait for the echo pin to go low (pulse end)
     pulse_end = time.time()
     while GPIO.input(echo) == 1:
         pulse_end = time.time()
+        if pulse_end - pulse_start > timeout:
+            return -1
 
     # Calculate the duration of the pulse
     pulse_duration = pulse_end - pulse_start
@@ -118,31 +134,46 @@ def remove_outliers(data, factor=1.5):
     return [x for x in data if lower_bound <= x <= upper_bound]
 
 
-def recyclable_bin():
+def monitor_bin(bin_id, trigger, echo, waste_id):
     """
-    Continuously measure and update the fill level of the recyclable bin.
+    Continuously measure and update the fill level of one bin compartment.
+    Parameters:
+    - bin_id: Unique ID of the bin
+    - trigger: GPIO pin number for the trigger pin of the sensor
+    - echo: GPIO pin number for the echo pin of the sensor
+    - waste_id: Type of waste (1 for recyclable, 2 for non-recyclable)
     """
     try:
         while True:
-            # Measure distance for the recyclable bin every 3 seconds
-            time.sleep(3)
-            distance = measure_distance(TRIG_BIN_ONE, ECHO_BIN_ONE)
-            update_bin_level(config.BIN_ID, distance, 1)    # Update bin with ID 1 (recyclable)
+            heartbeat()  # Report progress to the supervisor
+            # Measure distance for the compartment every 3 seconds, less often when idle or hot
+            time.sleep(power_governor.scale(3))
+            distance = measure_distance(trigger, echo)
+            heartbeat()
+            update_bin_level(bin_id, distance, waste_id)
     except KeyboardInterrupt:  # Handle keyboard interrupt to exit cleanly
         print("Keyboard interrupt")
 
+def station_monitors(station):
+    """
+    Return (target, args) pairs for the recyclable and non-recyclable monitors of a station.
+    """
+    return [
+        (monitor_bin, (station["bin_id"], station["trig_recyclable_bin"], station["echo_recyclable_bin"], config.RECYCLABLE)),
+        (monitor_bin, (station["bin_id"], station["trig_non_recyclable_bin"], station["echo_non_recyclable_bin"], config.NON_RECYCLABLE)),
+    ]
+
+def recyclable_bin():
+    """
+    Continuously measure and update the fill level of the recyclable bin.
+    """
+    monitor_bin(config.BIN_ID, TRIG_BIN_ONE, ECHO_BIN_ONE, 1)    # Update bin with ID 1 (recyclable)
+
 def non_recyclable_bin():
     """
     Continuously measure and update the fill level of the non-recyclable bin.
     """
-    try:
-        while True:
-            # Measure distance for the non-recyclable bin every 3 seconds
-            time.sleep(3)
-            distance = measure_distance(TRIG_BIN_TWO, ECHO_BIN_TWO)
-            update_bin_level(config.BIN_ID, distance, 2)    # Update bin with ID 2 (non-recyclable)
-    except KeyboardInterrupt:  # Handle keyboard interrupt to exit cleanly
-        print("Keyboard interrupt")
+    monitor_bin(config.BIN_ID, TRIG_BIN_TWO, ECHO_BIN_TWO, 2)    # Update bin with ID 2 (non-recyclable)
 
 def ensure_waste_type_exists(bin_id, waste_type_id):
     """
@@ -156,6 +187,7 @@ def ensure_waste_type_exists(bin_id, waste_type_id):
     args = (bin_id, waste_type_id)
 
     result = db.fetch_one(query_check, args)
+    heartbeat()
 
     # Debugging output to verify result structure
     print(f"Query result: {result}")
@@ -172,6 +204,43 @@ def ensure_waste_type_exists(bin_id, waste_type_id):
     else:
         print("Unexpected result format:", result)
 
+# Whether waste_level has the forecast columns, None until checked
+forecast_columns_ready = None
+
+def forecast_columns_available():
+    """
+    Check once that waste_level has the forecast columns added by the schema migrations.
+    """
+    global forecast_columns_ready
+    if forecast_columns_ready is None:
+        ready = db.has_columns("waste_level", ("fill_rate_per_hour", "predicted_full_at"))
+        if ready is False:
+            print("Warning: waste_level has no forecast columns, fill forecasts are not stored. "
+                  "Run python -m app.engine.migrations migrate and restart.")
+        forecast_columns_ready = ready
+    return bool(forecast_columns_ready)
+
+def publish_forecast(bin_id, waste_id, forecast):
+    """
+    Store the fill rate and predicted time until the bin is full next to its level.
+    Parameters:
+    - bin_id: Unique ID of the bin
+    - waste_id: Type of waste (1 for recyclable, 2 for non-recyclable)
+    - forecast: Forecast returned by fill_forecaster.add_sample
+    Returns the columns written, or None if the update failed.
+    """
+    query_update = """
+    UPDATE waste_level
+    SET fill_rate_per_hour = %s, predicted_full_at = %s
+    WHERE bin_id = %s AND waste_type_id = %s
+    """
+    args_update = (forecast["fill_rate_per_hour"], forecast["predicted_full_at"], bin_id, waste_id)
+
+    if not db.update(query_update, args_update):
+        print(f"Failed to publish fill forecast for bin {bin_id}.")
+        return None
+    return {"fill_rate_per_hour": forecast["fill_rate_per_hour"], "predicted_full_at": forecast["predicted_full_at"]}
+
 def update_bin_level(bin_id, distance, waste_id):
     """
     Update the current fill level of a waste bin in the database.
@@ -194,7 +263,11 @@ def update_bin_level(bin_id, distance, waste_id):
     """
     args_update = (distance, bin_id, waste_id)
 
+    # Each query may take up to the database timeouts, report progress between them
+    heartbeat()
+
     # Attempt to update the record, insert if update fails
+    written = True
     if not db.update(query_update, args_update):
         # Insert a new record if the update failed
         query_insert = """
@@ -203,13 +276,43 @@ def update_bin_level(bin_id, distance, waste_id):
         """
         args_insert = (bin_id, waste_id, distance)
 
+        heartbeat()
         if db.update(query_insert, args_insert):
             print(f"Inserted new bin {waste_id} with level {distance} cm.")
         else:
             print(f"Failed to update or insert bin {waste_id}.")
+            # The database state is unknown now, read it back next time
+            bin_level_cache.invalidate(bin_id)
+            written = False
     else:
         print(f"Updated bin {waste_id} with level {distance} cm.")
 
+    # Update the fill rate estimate; -1 marks a failed reading and is skipped
+    forecast = None
+    if distance >= 0:
+        forecast = fill_forecaster.add_sample(bin_id, waste_id, distance)
+
+    # Keep the local copy of the bin levels in step with what was just written
+    if written:
+        bin_level_cache.update(bin_id, waste_id, {"current_fill_level": distance, "last_update": datetime.datetime.now()})
+
+    heartbeat()
+
+    # Publish the forecast alongside the level; the cache only mirrors the columns written
+    if forecast and fill_forecaster.due_for_publish(bin_id, waste_id) and forecast_columns_available():
+        published = publish_forecast(bin_id, waste_id, forecast)
+        if published:
+            bin_level_cache.update(bin_id, waste_id, published)
+
+    # Aggregate the sample into the per-minute and per-hour rollups, skipping failed readings
+    if distance >= 0:
+        heartbeat()
+        rollup_engine.add_sample(bin_id, waste_id, distance)
+
+    # Raw history is thinned out, the rollups carry the full-rate aggregates
+    if not rollup_engine.should_store_raw(bin_id, waste_id):
+        return
+
     # Insert a record into bin_fill_levels table for tracking the fill level over time
     query_fill_levels_insert = """
     INSERT INTO bin_fill_levels (bin_id, waste_type, timestamp, fill_level)
@@ -218,6 +321,7 @@ def update_bin_level(bin_id, distance, waste_id):
     waste_type = 'recyclable' if waste_id == 1 else 'non-recyclable'  # Determine waste type string based on ID
     args_fill_levels_insert = (bin_id, waste_id, distance)
 
+    heartbeat()
     if db.update(query_fill_levels_insert, args_fill_levels_insert):
         print(f"Inserted fill level record for bin {bin_id} of type {waste_type} with level {distance} cm.")
     else: